@@ -0,0 +1,263 @@
+"""Headless HTTP API for blog generation.
+
+Exposes generate_content and the article exports without the Streamlit page, for
+programmatic clients such as a CMS. Each process runs at most API_MAX_IN_FLIGHT
+generations and answers 429 beyond that, so several processes can be put behind
+a load balancer. Progress is streamed as server-sent events on request.
+
+    python api.py --host 0.0.0.0 --port 8000 --workers 2
+
+    POST /generate          {"topic": ..., "model": ..., "temperature": 0.7, "research_mode": "single", "writing_mode": "single",
+                             "force": false}
+                            "model" is one of API_MODELS, add "stream": true (or
+                            Accept: text/event-stream) for progress events
+    POST /export/{format}   {"markdown": ..., "topic": ...}, format is one of export.EXPORTERS
+    GET  /health            in-flight generations and the limit
+    GET  /metrics           Prometheus text format
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from export import EXPORTERS, export_article, export_filename
+from generator import (DEFAULT_MODEL, DEFAULT_RESEARCH_MODE, DEFAULT_TEMPERATURE, DEFAULT_WRITING_MODE, RESEARCH_MODES,
+                       WRITING_MODES, generate_content)
+from metrics import registry
+
+# API settings (override in .env)
+API_MAX_IN_FLIGHT = int(os.getenv("API_MAX_IN_FLIGHT", 4))
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", 15 * 60))
+API_RETRY_AFTER = int(os.getenv("API_RETRY_AFTER", 30))
+# Models clients may ask for, comma separated. Anything else would reach whichever
+# provider its name routes to, with this server's keys
+API_MODELS = tuple(model.strip() for model in os.getenv("API_MODELS", DEFAULT_MODEL).split(",") if model.strip())
+
+
+class BadRequest(Exception):
+    """Raised for request bodies that cannot be processed"""
+
+
+class Admission:
+    """Bounded number of generations in flight in this process
+
+    A slot is held until the generation thread finishes, even when the client has
+    timed out or disconnected, because crews cannot be cancelled midway.
+    """
+
+    def __init__(self, limit=API_MAX_IN_FLIGHT):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix="api-generation")
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def start(self, function, *args, **kwargs):
+        """Run function in the generation pool on a held slot, returning an asyncio future"""
+        def run():
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.release()
+
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, contextvars.copy_context().run, run)
+
+
+admission = Admission()
+
+
+def error(status, message, headers=None):
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("Request body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("Request body must be a JSON object")
+    return body
+
+
+def flag(body, name):
+    """A boolean field of a request body, false when absent"""
+    value = body.get(name, False)
+    if not isinstance(value, bool):
+        raise BadRequest(f"'{name}' must be true or false")
+    return value
+
+
+def generation_params(body):
+    """Validate a /generate body into generate_content keyword arguments"""
+    topic = body.get("topic")
+    if not isinstance(topic, str) or not topic.strip():
+        raise BadRequest("'topic' must be a non-empty string")
+    research_mode = body.get("research_mode", DEFAULT_RESEARCH_MODE)
+    if research_mode not in RESEARCH_MODES:
+        raise BadRequest(f"'research_mode' must be one of {list(RESEARCH_MODES)}")
+    writing_mode = body.get("writing_mode", DEFAULT_WRITING_MODE)
+    if writing_mode not in WRITING_MODES:
+        raise BadRequest(f"'writing_mode' must be one of {list(WRITING_MODES)}")
+    model = body.get("model", DEFAULT_MODEL)
+    if not isinstance(model, str) or model not in API_MODELS:
+        raise BadRequest(f"'model' must be one of {list(API_MODELS)}")
+    try:
+        temperature = float(body.get("temperature", DEFAULT_TEMPERATURE))
+    except (TypeError, ValueError):
+        raise BadRequest("'temperature' must be a number")
+    if not 0.0 <= temperature <= 1.0:
+        raise BadRequest("'temperature' must be between 0.0 and 1.0")
+    return {
+        "topic": topic.strip(),
+        "model": model,
+        "temperature": temperature,
+        "research_mode": research_mode,
+        "writing_mode": writing_mode,
+        "force": flag(body, "force"),
+    }
+
+
+def result_body(result):
+    return {"topic": result.topic, "article": result.raw, "cached": result.cached, "metrics": result.metrics}
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def generate(request):
+    try:
+        body = await read_json(request)
+        params = generation_params(body)
+        stream = flag(body, "stream") or "text/event-stream" in request.headers.get("accept", "")
+    except BadRequest as e:
+        return error(400, str(e))
+
+    if not admission.try_acquire():
+        return error(429, f"{admission.limit} generations are already running, retry later",
+                     headers={"Retry-After": str(API_RETRY_AFTER)})
+
+    if stream:
+        # Started here rather than in the response body, so the slot is released
+        # even if the client disconnects before the stream begins
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def on_progress(event, detail):
+            # Called on crewai's threads
+            loop.call_soon_threadsafe(events.put_nowait, (event, detail))
+
+        future = admission.start(generate_content, on_progress=on_progress, **params)
+        future.add_done_callback(lambda _: events.put_nowait(None))
+        return StreamingResponse(stream_events(future, events), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    future = admission.start(generate_content, **params)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(future), API_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return error(504, f"Generation did not finish within {API_REQUEST_TIMEOUT:.0f}s, "
+                          "its result is cached when it does")
+    except Exception as e:
+        return error(500, str(e))
+    return JSONResponse(result_body(result))
+
+
+async def stream_events(future, events):
+    """Server-sent events: progress events as the crews run, then "result" or "error" """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + API_REQUEST_TIMEOUT
+
+    while True:
+        try:
+            item = await asyncio.wait_for(events.get(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            yield sse("error", {"error": f"Generation did not finish within {API_REQUEST_TIMEOUT:.0f}s"})
+            return
+        if item is None:
+            break
+        event, detail = item
+        yield sse(event, {"detail": detail})
+
+    try:
+        result = future.result()
+    except Exception as e:
+        yield sse("error", {"error": str(e)})
+    else:
+        yield sse("result", result_body(result))
+
+
+async def export(request):
+    format = request.path_params["format"]
+    if format not in EXPORTERS:
+        return error(404, f"Unknown export format {format!r}, expected one of {list(EXPORTERS)}")
+    try:
+        body = await read_json(request)
+    except BadRequest as e:
+        return error(400, str(e))
+    markdown = body.get("markdown")
+    if not isinstance(markdown, str):
+        return error(400, "'markdown' must be a string")
+
+    content = await run_in_threadpool(export_article, markdown, format)
+    filename = export_filename(body.get("topic") or "blog", format)
+    return Response(content, media_type=EXPORTERS[format].mime,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+async def health(request):
+    return JSONResponse({"in_flight": admission.in_flight, "max_in_flight": admission.limit,
+                         "rejected": admission.rejected})
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/generate", generate, methods=["POST"]),
+    Route("/export/{format}", export, methods=["POST"]),
+    Route("/health", health),
+    Route("/metrics", prometheus_metrics),
+])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the blog generator over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own in-flight limit")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Headless batch generation.
+
+Reads topics from a JSONL file (one object per line with a "topic" or "title"
+field and an optional "id"), runs several generations concurrently and writes
+each article in the requested formats (markdown and DOCX by default) plus a
+status record as soon as it finishes.
+Re-running the same command resumes the batch, skipping finished items.
+
+    python batch.py topics.jsonl --output-dir output --concurrency 4
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from export import EXPORTERS, export_article, export_filename
+from generator import (DEFAULT_MODEL, DEFAULT_RESEARCH_MODE, DEFAULT_TEMPERATURE, DEFAULT_WRITING_MODE, RESEARCH_MODES,
+                       WRITING_MODES, generate_content)
+
+STATUS_FILE = "status.jsonl"
+DEFAULT_FORMATS = ("markdown", "docx")
+# Ids start the output file names, so they are limited to characters safe in a path segment
+ITEM_ID_PATTERN = re.compile(r'[\w-]{1,100}')
+
+
+def load_topics(path):
+    """Read batch items from a JSONL file, skipping blank lines
+
+    Ids name the output files and the status records, so they must be unique and
+    only use letters, digits, "_" and "-".
+    """
+    items = []
+    seen = {}  # id -> line number
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            topic = record.get("topic") or record.get("title")
+            if not topic:
+                raise ValueError(f"{path}:{line_number}: missing 'topic' field")
+            item_id = str(record.get("id") or record.get("request_id") or line_number)
+            if not ITEM_ID_PATTERN.fullmatch(item_id):
+                raise ValueError(f"{path}:{line_number}: id {item_id!r} may only use letters, digits, '_' and '-'")
+            if item_id in seen:
+                raise ValueError(f"{path}:{line_number}: id {item_id!r} already used on line {seen[item_id]}")
+            seen[item_id] = line_number
+            items.append({"id": item_id, "topic": topic})
+    return items
+
+
+def load_finished(output_dir):
+    """Return the ids of items whose latest status record is 'done'"""
+    status_path = os.path.join(output_dir, STATUS_FILE)
+    latest = {}
+    if os.path.exists(status_path):
+        with open(status_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    latest[record["id"]] = record
+    return {
+        item_id for item_id, record in latest.items()
+        if record["status"] == "done" and all(os.path.exists(p) for p in record["files"])
+    }
+
+
+class StatusLog:
+    """Append-only, thread-safe writer for per-item status records"""
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, STATUS_FILE)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+
+def process_item(item, output_dir, model, temperature, force, research_mode, profile=False, formats=DEFAULT_FORMATS,
+                 writing_mode=DEFAULT_WRITING_MODE):
+    """Generate one article and write a file per export format"""
+    result = generate_content(
+        item["topic"], model=model, temperature=temperature, force=force, research_mode=research_mode,
+        profile=profile, writing_mode=writing_mode
+    )
+    paths = []
+    for format in formats:
+        path = os.path.join(output_dir, f"{item['id']}_{export_filename(item['topic'], format)}")
+        with open(path, "wb") as f:
+            f.write(export_article(result.raw, format))
+        paths.append(path)
+    return result, paths
+
+
+def run_batch(items, output_dir, concurrency=4, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, force=False,
+              research_mode=DEFAULT_RESEARCH_MODE, profile=False, formats=DEFAULT_FORMATS, writing_mode=DEFAULT_WRITING_MODE):
+    """Process items with at most `concurrency` generations in flight, return a summary"""
+    os.makedirs(output_dir, exist_ok=True)
+    finished = load_finished(output_dir)
+    pending = [item for item in items if item["id"] not in finished]
+    status_log = StatusLog(output_dir)
+    summary = {"total": len(items), "skipped": len(items) - len(pending), "done": 0, "failed": 0}
+
+    print(f"{len(pending)} of {len(items)} items to process ({summary['skipped']} already finished)")
+    start = time.monotonic()
+
+    def run(item):
+        item_start = time.monotonic()
+        try:
+            result, files = process_item(item, output_dir, model, temperature, force, research_mode, profile, formats,
+                                         writing_mode)
+            record = {"status": "done", "files": files, "cached": result.cached, "metrics": result.metrics}
+        except Exception as e:
+            traceback.print_exc()
+            record = {"status": "failed", "files": [], "error": str(e)}
+        record.update({
+            "id": item["id"],
+            "topic": item["topic"],
+            "duration": round(time.monotonic() - item_start, 3),
+            "finished_at": time.time(),
+        })
+        status_log.write(record)
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(run, item) for item in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            summary[record["status"]] += 1
+            print(f"[{record['status']}] {record['id']}: {record['topic']} ({record['duration']}s)")
+
+    elapsed = time.monotonic() - start
+    summary["elapsed"] = round(elapsed, 3)
+    summary["articles_per_hour"] = round(summary["done"] / elapsed * 3600, 1) if elapsed and summary["done"] else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate blog posts for every topic in a JSONL file")
+    parser.add_argument("topics", help="JSONL file with one {\"topic\": ...} object per line")
+    parser.add_argument("--output-dir", default="output", help="Directory for articles and status.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of generations in flight")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument("--research-mode", choices=RESEARCH_MODES, default=DEFAULT_RESEARCH_MODE,
+                        help="'parallel' researches each focus area concurrently")
+    parser.add_argument("--writing-mode", choices=WRITING_MODES, default=DEFAULT_WRITING_MODE,
+                        help="'sections' writes the sections of an outline concurrently")
+    parser.add_argument("--force", action="store_true", help="Ignore cached articles and regenerate")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help=f"Comma separated export formats, from {', '.join(EXPORTERS)}")
+    parser.add_argument("--profile", action="store_true", help="Dump a cProfile of every generation to metrics/profiles")
+    args = parser.parse_args(argv)
+    formats = args.formats.split(",")
+    unknown = [format for format in formats if format not in EXPORTERS]
+    if unknown:
+        parser.error(f"unknown export formats: {', '.join(unknown)}")
+
+    summary = run_batch(
+        load_topics(args.topics),
+        args.output_dir,
+        concurrency=args.concurrency,
+        model=args.model,
+        temperature=args.temperature,
+        force=args.force,
+        research_mode=args.research_mode,
+        writing_mode=args.writing_mode,
+        profile=args.profile,
+        formats=formats,
+    )
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
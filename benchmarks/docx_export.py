@@ -0,0 +1,109 @@
+"""Markdown to DOCX conversion time and peak memory on synthetic articles.
+
+Each size runs in a fresh interpreter so peak RSS is not inflated by earlier sizes.
+
+    python -m benchmarks.docx_export --sizes 1K,10K,100K,1M,5M
+    python -m benchmarks.docx_export --sizes 100K --url-pool 20   # citation heavy
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from export import markdown_to_docx
+
+SECTION = """### Section {n}: Key **trends** and *insights*
+
+The market grew by **{n}%** this year according to [Industry Report {u}](https://example.com/reports/{u}) and analysts expect further growth [Source: https://example.org/source/{u}].
+- Adoption is accelerating across *enterprise* customers, see https://example.net/adoption/{u}
+- Costs fell sharply after Link (https://example.com/costs/{u}) was published
+1. First finding with **bold** emphasis
+2. Second finding citing [Study {u}](https://example.edu/study/{u})
+---
+"""
+
+SIZE_UNITS = {"K": 1024, "M": 1024 * 1024}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def synthetic_article(size, url_pool=None):
+    """Build a markdown article of roughly `size` bytes
+
+    Every section cites new URLs unless url_pool is set, in which case sections
+    cycle through that many sources, like a citation heavy research article.
+    """
+    parts = ["# Synthetic **Benchmark** Article\n\n"]
+    total = len(parts[0])
+    n = 0
+    while total < size:
+        n += 1
+        section = SECTION.format(n=n, u=n % url_pool if url_pool else n)
+        parts.append(section)
+        total += len(section)
+    return "".join(parts)
+
+
+def max_rss_mib():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(markdown, repeat):
+    """Best-of-`repeat` conversion time, peak RSS growth and peak Python heap of the conversions"""
+    rss_before = max_rss_mib()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = markdown_to_docx(markdown)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    markdown_to_docx(markdown)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "input_bytes": len(markdown.encode()),
+        "lines": markdown.count("\n"),
+        "best_s": round(min(timings), 4),
+        "peak_rss_growth_mib": round(max_rss_mib() - rss_before, 2),
+        "peak_python_heap_mib": round(peak / (1024 * 1024), 2),
+        "output_bytes": len(output),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1K,10K,100K,1M,5M", help="Comma separated article sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed conversions per size")
+    parser.add_argument("--url-pool", type=int, help="Cycle citations through this many distinct sources")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        markdown_to_docx("# warm up")  # Exclude the python-docx import from the timings
+        result = measure(synthetic_article(parse_size(args.sizes), args.url_pool), args.repeat)
+        print(json.dumps({"size": args.sizes, **result}))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for size in args.sizes.split(","):
+        command = [sys.executable, "-m", "benchmarks.docx_export", "--child", "--sizes", size, "--repeat", str(args.repeat)]
+        if args.url_pool:
+            command += ["--url-pool", str(args.url_pool)]
+        subprocess.run(command, cwd=root, check=True)
+
+
+if __name__ == "__main__":
+    main()
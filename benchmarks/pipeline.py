@@ -0,0 +1,483 @@
+"""Offline end-to-end benchmark of generate_content and the DOCX export.
+
+The Cohere model, the Serper API and the citation link checks are replaced by
+deterministic stand-ins with configurable latency, so no keys are needed and results are comparable between
+runs. Every concurrency level runs in a fresh interpreter with empty caches and
+reports p50/p95 latency, throughput and peak Python heap per stage. Results are
+appended to benchmarks/results/pipeline.jsonl and compared with the last run of
+the same configuration.
+
+    python -m benchmarks.pipeline --topics 8 --concurrency 1,4
+    python -m benchmarks.pipeline --research-mode parallel --llm-latency 0.5 --tokens-per-second 50
+    python -m benchmarks.pipeline --writing-mode sections --article-words 3000 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results", "pipeline.jsonl")
+
+TOPICS = [
+    "Edge computing in retail",
+    "Battery recycling startups",
+    "Open source large language models",
+    "Remote work and commercial real estate",
+    "Quantum-safe cryptography",
+    "Vertical farming economics",
+    "Small modular nuclear reactors",
+    "Satellite internet for rural areas",
+    "Synthetic biology in food production",
+    "Carbon capture at cement plants",
+    "Humanoid robots in warehouses",
+    "Privacy-preserving advertising",
+]
+
+WORDS = (
+    "adoption analysts growth market costs investment regulation customers platform "
+    "providers revenue efficiency demand supply research pilots deployment competition "
+    "standards security infrastructure partnerships forecasts margins scale"
+).split()
+
+# Defaults of benchmark settings that older results were stored without
+CONFIG_DEFAULTS = {"writing_mode": "single", "link_latency": 0.1}
+
+SEARCH_TOOL_NAME = "Search the internet with Serper"
+TOPIC_PATTERN = re.compile(r"(?:research on|blog post about) (.+?)(?:,| including| that)")
+URL_PATTERN = re.compile(r"https://example\.org/[\w/-]+")
+MARKER_PATTERN = re.compile(r"\[\d+\]")
+HEADING_PATTERN = re.compile(r'heading line "### (.+?)"')
+
+# Words per section of the sections writing mode
+SECTION_WORDS = 300
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def research_brief(rng, topic, findings, urls):
+    """A research brief in the shape the analyst produces, citing the search results"""
+    urls = urls or ["https://example.org/reference"]
+    lines = [f"## Research brief: {topic}", "", "### Key findings", ""]
+    for _ in range(findings):
+        lines.append(f"- {sentence(rng)} ({rng.randint(5, 95)}%) [Source: {rng.choice(urls)}]")
+    return "\n".join(lines)
+
+
+def article(rng, topic, urls, words):
+    """A blog post in the shape the writer produces, citing the brief's URLs"""
+    urls = urls or ["https://example.org/reference"]
+    parts = [f"# {topic}: What You Need to Know", "", sentence(rng, 40) + ".", ""]
+    written = 40
+    section = 0
+    while written < words:
+        section += 1
+        url = urls[section % len(urls)]
+        parts += [
+            f"### {sentence(rng, 4)}", "",
+            f"{sentence(rng, 60)} according to [this report]({url}). **{sentence(rng, 6)}** [Source: {url}]", "",
+            f"- {sentence(rng, 15)}", f"- {sentence(rng, 15)}", "",
+        ]
+        written += 100
+    parts += ["### References", ""] + [f"{i}. {url}" for i, url in enumerate(urls, start=1)]
+    return "\n".join(parts)
+
+
+def outline(rng, topic, markers, words):
+    """An outline in the shape the writer plans, citing the brief's markers"""
+    markers = markers or ["[1]"]
+    lines = [f"# {topic}: What You Need to Know"]
+    for _ in range(max(1, words // SECTION_WORDS)):
+        lines.append(f"### {sentence(rng, 4)}")
+        lines += [f"- {sentence(rng, 8)} {rng.choice(markers)}" for _ in range(3)]
+    return "\n".join(lines)
+
+
+def section(rng, heading, urls, words):
+    """One section in the shape the writer produces, citing the slice's URLs"""
+    urls = urls or ["https://example.org/reference"]
+    parts = [f"### {heading}", ""]
+    for written in range(0, words, 100):
+        url = urls[written // 100 % len(urls)]
+        parts += [f"{sentence(rng, 60)} according to [this report]({url}). **{sentence(rng, 6)}** [Source: {url}]", "",
+                  f"- {sentence(rng, 15)}", f"- {sentence(rng, 15)}", ""]
+    return "\n".join(parts)
+
+
+@functools.cache
+def fake_llm_class():
+    """Return the FakeLLM class, defined on first use like the crewai dependent code it stands in for"""
+    from crewai.events.types.llm_events import LLMCallType
+    from crewai.llms.base_llm import BaseLLM, llm_call_context
+
+    class FakeLLM(BaseLLM):
+        """Deterministic stand-in for the Cohere model
+
+        Research agents search once and then answer with a brief, the writer answers
+        with an article citing the brief's URLs, or with an outline, one section of
+        it, or an introduction or conclusion in the sections writing mode. Each call waits `latency` seconds
+        before the first token, then emits tokens at `tokens_per_second`.
+        """
+
+        latency: float = 0.2
+        tokens_per_second: float = 0.0  # 0 returns the whole answer at once
+        findings: int = 12
+        article_words: int = 800
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+                 from_agent=None, response_model=None):
+            with llm_call_context():
+                self._emit_call_started_event(messages, from_task=from_task, from_agent=from_agent)
+                answer, usage = self._answer(messages, from_task, from_agent)
+                self._emit_call_completed_event(
+                    answer, LLMCallType.LLM_CALL, from_task=from_task, from_agent=from_agent, messages=messages,
+                    usage=usage,
+                )
+            return answer
+
+        def _answer(self, messages, from_task, from_agent):
+            if isinstance(messages, str):
+                messages = [{"role": "user", "content": messages}]
+            prompt = "\n".join(str(m.get("content", "")) for m in messages)
+            rng = random.Random(hashlib.sha256(prompt.encode()).hexdigest())
+            match = TOPIC_PATTERN.search(prompt)
+            topic = match.group(1) if match else "the topic"
+
+            urls = list(dict.fromkeys(URL_PATTERN.findall(prompt)))
+            if "Plan a blog post" in prompt:
+                markers = list(dict.fromkeys(MARKER_PATTERN.findall(prompt)))
+                answer = "Thought: I now can give a great answer\nFinal Answer: " + outline(rng, topic, markers, self.article_words)
+            elif "Write one section" in prompt:
+                match = HEADING_PATTERN.search(prompt)
+                heading = match.group(1) if match else "Section"
+                answer = "Thought: I now can give a great answer\nFinal Answer: " + section(rng, heading, urls, SECTION_WORDS)
+            elif "for a blog post about" in prompt:
+                # Introduction or conclusion
+                answer = "Thought: I now can give a great answer\nFinal Answer: " + sentence(rng, 60) + "."
+            elif "blog post" in prompt:
+                answer = "Thought: I now can give a great answer\nFinal Answer: " + article(rng, topic, urls, self.article_words)
+            elif not any(m.get("role") == "assistant" for m in messages):
+                # First turn of a research task: search before answering
+                query = json.dumps({"search_query": f"{topic} {rng.choice(WORDS)}"})
+                answer = f"Thought: I should search for recent sources\nAction: {SEARCH_TOOL_NAME}\nAction Input: {query}"
+            else:
+                answer = "Thought: I now can give a great answer\nFinal Answer: " + research_brief(rng, topic, self.findings, urls)
+
+            time.sleep(self.latency)
+            tokens = answer.split(" ")
+            if self.tokens_per_second:
+                for token in tokens:
+                    time.sleep(1 / self.tokens_per_second)
+                    if self.stream:
+                        self._emit_stream_chunk_event(token + " ", from_task=from_task, from_agent=from_agent)
+            return answer, {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens)}
+
+    return FakeLLM
+
+
+def install_fakes(llm_latency, tokens_per_second, search_latency, findings, article_words, link_latency):
+    """Replace the LLM factory, the Serper request and the link check request with the stand-ins"""
+    import generator
+    from citations import LinkChecker
+    from crewai_tools import SerperDevTool
+
+    llm_class = fake_llm_class()
+
+    @functools.lru_cache(maxsize=16)
+    def fake_get_llm(model, temperature, stream=False):
+        return llm_class(
+            model=model, temperature=temperature, stream=stream, latency=llm_latency,
+            tokens_per_second=tokens_per_second, findings=findings, article_words=article_words,
+        )
+
+    def fake_search(self, search_query, search_type):
+        time.sleep(search_latency)
+        rng = random.Random(search_query)
+        return {
+            "searchParameters": {"q": search_query, "type": search_type},
+            "organic": [
+                {"title": sentence(rng, 6), "link": f"https://example.org/{i}/{rng.randint(0, 10**6)}",
+                 "snippet": sentence(rng, 25), "position": i}
+                for i in range(1, self.n_results + 1)
+            ],
+        }
+
+    async def fake_check(self, url):
+        async with self._host_slot(url):
+            await asyncio.sleep(link_latency)
+        return {"url": url, "state": "ok", "status": 200, "error": None, "checked": time.time()}
+
+    generator.get_llm = fake_get_llm
+    # CachedSerperDevTool calls this on a search cache miss
+    SerperDevTool._make_api_request = fake_search
+    # Pooling, per-host limits and the link cache stay real, only the request is replaced
+    LinkChecker._check = fake_check
+
+
+class StageMemory:
+    """Peak traced Python heap while each pipeline stage is active
+
+    Stages are tracked by wrapping metrics.stage in the modules that use it, and a
+    sampler thread reads the traced heap every `interval` seconds. With several
+    runs in flight the peaks include the other runs' allocations.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.active = defaultdict(int)
+        self.peaks = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def install(self):
+        import citations
+        import export
+        import generator
+        import metrics
+        import tools
+
+        for module in (metrics, generator, tools, export, citations):
+            module.stage = self.wrap(module.stage)
+        tracemalloc.start()
+        threading.Thread(target=self._sample, daemon=True).start()
+
+    def wrap(self, stage):
+        @contextmanager
+        def tracked_stage(name):
+            with self._lock:
+                self.active[name] += 1
+            self._observe()
+            try:
+                with stage(name):
+                    yield
+            finally:
+                self._observe()
+                with self._lock:
+                    self.active[name] -= 1
+        return tracked_stage
+
+    def _observe(self):
+        current = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            for name, count in self.active.items():
+                if count:
+                    self.peaks[name] = max(self.peaks[name], current)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._observe()
+
+    def stop(self):
+        self._stop.set()
+        tracemalloc.stop()
+        return {name: round(peak / (1024 * 1024), 2) for name, peak in self.peaks.items()}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))]
+
+
+def summarize(samples):
+    return {
+        "p50_s": round(percentile(samples, 50), 4),
+        "p95_s": round(percentile(samples, 95), 4),
+        "mean_s": round(statistics.mean(samples), 4),
+        "count": len(samples),
+    }
+
+
+def run_level(topics, concurrency, research_mode, writing_mode, trace_memory):
+    """Generate and export every topic with `concurrency` runs in flight"""
+    import crewai_tools  # noqa: F401  Import cost is not part of the measurement
+    import docx  # noqa: F401
+    import generator
+    from export import markdown_to_docx
+
+    memory = StageMemory() if trace_memory else None
+    if memory is not None:
+        memory.install()
+
+    stage_samples = defaultdict(list)
+    counters = defaultdict(int)
+    sizes = defaultdict(list)
+    lock = threading.Lock()
+
+    def run(topic):
+        result = generator.generate_content(topic, research_mode=research_mode, writing_mode=writing_mode)
+        start = time.perf_counter()
+        markdown_to_docx(result.raw)
+        export_s = time.perf_counter() - start
+        with lock:
+            for name, stage in result.metrics["stages"].items():
+                stage_samples[name].append(stage["seconds"])
+            stage_samples["docx_export"].append(export_s)
+            for name, value in result.metrics["counters"].items():
+                counters[name] += value
+            for name, value in result.metrics["sizes"].items():
+                sizes[name].append(value)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, topics))
+    elapsed = time.perf_counter() - start
+
+    peaks = memory.stop() if memory is not None else {}
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "articles_per_minute": round(len(topics) / elapsed * 60, 2),
+        "stages": {
+            name: {**summarize(samples), "peak_heap_mib": peaks.get(name)}
+            for name, samples in sorted(stage_samples.items())
+        },
+        "counters": dict(counters),
+        "mean_sizes": {name: round(statistics.mean(values)) for name, values in sorted(sizes.items())},
+    }
+
+
+def run_child(args, concurrency):
+    """Run one concurrency level in a fresh interpreter with empty caches"""
+    with tempfile.TemporaryDirectory(prefix="blog-benchmark-") as tmp:
+        env = dict(os.environ)
+        env.update({
+            "BLOG_CACHE_DIR": os.path.join(tmp, "cache"),
+            "METRICS_DIR": os.path.join(tmp, "metrics"),
+            # Only checked for presence, nothing is sent to the providers
+            "SERPER_API_KEY": "benchmark",
+            "COHERE_API_KEY": "benchmark",
+            # Provider rate limits are not part of the measurement
+            "LLM_RATE_LIMIT": "0",
+            "SEARCH_RATE_LIMIT": "0",
+            "CREWAI_DISABLE_TELEMETRY": "true",
+            "OTEL_SDK_DISABLED": "true",
+        })
+        command = [sys.executable, "-m", "benchmarks.pipeline", "--child", "--concurrency", str(concurrency)]
+        command += child_arguments(args)
+        output = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark_config(args):
+    """The settings that make results comparable, stored with every result"""
+    return {
+        "topics": args.topics,
+        "research_mode": args.research_mode,
+        "writing_mode": args.writing_mode,
+        "llm_latency": args.llm_latency,
+        "tokens_per_second": args.tokens_per_second,
+        "search_latency": args.search_latency,
+        "link_latency": args.link_latency,
+        "findings": args.findings,
+        "article_words": args.article_words,
+        "trace_memory": args.trace_memory,
+    }
+
+
+def child_arguments(args):
+    arguments = []
+    for name, value in benchmark_config(args).items():
+        if name != "trace_memory":
+            arguments += ["--" + name.replace("_", "-"), str(value)]
+    return arguments + ([] if args.trace_memory else ["--no-trace-memory"])
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(path, config):
+    """The most recent stored result for each concurrency level of this configuration"""
+    previous = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    # Settings added since the record was written had their default
+                    if {**CONFIG_DEFAULTS, **record["config"]} == config:
+                        previous[record["concurrency"]] = record
+    return previous
+
+
+def compare(record, previous):
+    """One line comparing the p50 of every stage with the previous stored run"""
+    if previous is None:
+        return "no previous run to compare with"
+    changes = []
+    for name, stage in record["stages"].items():
+        before = previous["stages"].get(name)
+        if before and before["p50_s"]:
+            changes.append(f"{name} {(stage['p50_s'] / before['p50_s'] - 1) * 100:+.1f}%")
+    return f"p50 vs {previous['revision']} ({previous['timestamp']}): " + ", ".join(changes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=8, help="Number of distinct topics generated per level")
+    parser.add_argument("--concurrency", default="1,4", help="Comma separated numbers of runs in flight")
+    parser.add_argument("--research-mode", default="single", choices=["single", "parallel"])
+    parser.add_argument("--writing-mode", default="single", choices=["single", "sections"])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds before the first token of each LLM call")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Token rate of LLM answers, 0 for instant")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Seconds per search API request")
+    parser.add_argument("--link-latency", type=float, default=0.1, help="Seconds per citation link check")
+    parser.add_argument("--findings", type=int, default=12, help="Findings per research brief")
+    parser.add_argument("--article-words", type=int, default=800, help="Approximate article length")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="Skip per-stage heap tracing, which slows CPU bound stages down")
+    parser.add_argument("--output", default=RESULTS_FILE, help="JSONL file results are appended to")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    topics = [TOPICS[i % len(TOPICS)] + (f" ({i // len(TOPICS) + 1})" if i >= len(TOPICS) else "") for i in range(args.topics)]
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        install_fakes(args.llm_latency, args.tokens_per_second, args.search_latency, args.findings, args.article_words,
+                      args.link_latency)
+        print(json.dumps(run_level(topics, int(args.concurrency), args.research_mode, args.writing_mode, args.trace_memory)))
+        return
+
+    config = benchmark_config(args)
+    previous = previous_results(args.output, config)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    revision = git_revision()
+
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": revision,
+            "config": config,
+            "concurrency": concurrency,
+            **run_child(args, concurrency),
+        }
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(json.dumps(record, indent=2))
+        print(compare(record, previous.get(concurrency)))
+
+
+if __name__ == "__main__":
+    main()
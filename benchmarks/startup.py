@@ -0,0 +1,114 @@
+"""Startup and rerun timing for the Streamlit page.
+
+Each measurement runs in a fresh interpreter so imports are not already cached.
+
+    python -m benchmarks.startup --reruns 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_page(reruns):
+    """First render and rerun times of main.py, measured with Streamlit's AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "first_render_s": round(first, 3),
+        "rerun_mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "rerun_max_ms": round(max(timings) * 1000, 2),
+        "crewai_loaded_by_page": "crewai" in sys.modules,
+        "docx_loaded_by_page": "docx" in sys.modules,
+    }
+
+
+def measure_deferred_imports():
+    """Import cost that is now paid on the first generation instead of the first render"""
+    start = time.perf_counter()
+    import crewai_tools  # noqa: F401
+    crewai_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import docx  # noqa: F401
+    docx_s = time.perf_counter() - start
+    return {"crewai_import_s": round(crewai_s, 3), "docx_import_s": round(docx_s, 3)}
+
+
+def measure_crew_construction(runs):
+    """Time to build the crews for a run, first (cold factories) and subsequent (cached)"""
+    import crewai_tools  # noqa: F401  Import cost is reported separately
+    import generator
+
+    def build():
+        generator.build_research_crew()
+        generator.build_writing_crew()
+
+    start = time.perf_counter()
+    build()
+    first = time.perf_counter() - start
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - start)
+    return {
+        "first_build_ms": round(first * 1000, 2),
+        "cached_build_mean_ms": round(statistics.mean(timings) * 1000, 2),
+    }
+
+
+def run_child(name, count):
+    """Run one measurement in a fresh interpreter and return its JSON result"""
+    env = dict(os.environ)
+    # Construction only needs keys to be present, nothing is sent to the providers
+    env.setdefault("SERPER_API_KEY", "benchmark")
+    env.setdefault("COHERE_API_KEY", "benchmark")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", name, "--reruns", str(count)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--child", choices=["page", "imports", "crew"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        measure = {"page": measure_page, "imports": measure_deferred_imports, "crew": measure_crew_construction}[args.child]
+        result = measure(args.reruns) if args.child != "imports" else measure()
+        print(json.dumps(result))
+        return
+
+    results = {
+        "page": run_child("page", args.reruns),
+        "deferred_imports": run_child("imports", 0),
+        "crew_construction": run_child("crew", args.reruns),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("BLOG_CACHE_DIR", ".cache")
+
+
+class DiskCache:
+    """Persistent key/value store with TTL expiry and size-bounded LRU eviction"""
+
+    def __init__(self, name, ttl=None, max_entries=1000, max_bytes=None, cache_dir=None):
+        cache_dir = cache_dir or CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}.sqlite3")
+        self.ttl = ttl  # Seconds, None = never expires
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB, created REAL, accessed REAL, size INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection for one block, committed (or rolled back on error) and closed when it ends"""
+        # A fresh connection per operation keeps this safe across Streamlit threads
+        # and lets several processes share the same file through sqlite's locking
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss or expired entry"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return default
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        """Store value under key and evict least recently used entries over the limits"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, now, now, len(blob)),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        evicted = 0
+        if self.ttl is not None:
+            evicted += conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,)).rowcount
+        if self.max_entries is not None:
+            count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                evicted += conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        self.evictions += evicted
+
+    def delete(self, key):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from cache import DiskCache
+from export import INLINE_PATTERN, is_valid_url
+from fetch import FETCH_ALLOW_PRIVATE, USER_AGENT, BlockedURLError, ensure_public_url_async
+from metrics import record, stage
+from research import LIST_MARKER_PATTERN
+
+# What to do with citations whose URL is dead before the article is cached and
+# exported: "annotate" marks them, "strip" removes them, "off" skips the check
+CITATION_CHECK_MODES = ("annotate", "strip", "off")
+CITATION_CHECK = os.getenv("CITATION_CHECK", "annotate")
+
+# Link checking settings (override in .env)
+LINK_CHECK_MAX_CONNECTIONS = int(os.getenv("LINK_CHECK_MAX_CONNECTIONS", 100))
+LINK_CHECK_PER_HOST = int(os.getenv("LINK_CHECK_PER_HOST", 4))
+LINK_CHECK_TIMEOUT = float(os.getenv("LINK_CHECK_TIMEOUT", 5))
+# Working links are trusted for LINK_CACHE_TTL, dead ones are checked again sooner
+LINK_CACHE_TTL = int(os.getenv("LINK_CACHE_TTL", 7 * 24 * 60 * 60))
+LINK_DEAD_CACHE_TTL = int(os.getenv("LINK_DEAD_CACHE_TTL", 24 * 60 * 60))
+LINK_CACHE_MAX_ENTRIES = int(os.getenv("LINK_CACHE_MAX_ENTRIES", 20000))
+
+# Statuses that mean the page is gone, the only evidence a link is dead. Other
+# statuses (403 from bot protection, 429, 5xx) and failures to connect, which
+# include DNS lookups on a server without outbound access, leave it unverified
+DEAD_STATUSES = frozenset([404, 410])
+DEAD_LINK_NOTE = " *(link unavailable)*"
+
+# [Source: URL] and Source: URL citations, then every link the exporters render.
+# Bold and italic matches are scanned again for the links inside them, as the
+# exporters do
+LINK_PATTERN = re.compile(
+    r'\[Source:\s*(?P<source_url>https?://[^\s\]]+?)\s*\]|'
+    r'\bSources?:\s*(?P<label_url>https?://[^\s\)\],*]+)|' + INLINE_PATTERN.pattern
+)
+SPACE_BEFORE_PUNCTUATION_PATTERN = re.compile(r'[ \t]+([.,;:])')
+SPACES_PATTERN = re.compile(r'(?<=\S)[ \t]{2,}')
+# Parentheses that only held stripped citations
+EMPTY_PARENTHESES_PATTERN = re.compile(r'[ \t]*\([ \t]*\)')
+# Two periods left where a stripped citation sat between sentence ends, not an ellipsis
+DOUBLE_PERIOD_PATTERN = re.compile(r'(?<!\.)\.\.(?!\.)')
+REFERENCES_HEADING_PATTERN = re.compile(r'^#+\s*\**\s*(references|sources)\b', re.IGNORECASE)
+
+link_cache = DiskCache("links", ttl=LINK_CACHE_TTL, max_entries=LINK_CACHE_MAX_ENTRIES)
+
+
+def link_url(match):
+    """The URL of a LINK_PATTERN match, without trailing punctuation, or None for bold and italic text"""
+    url = (match.group('source_url') or match.group('label_url') or match.group('link_url')
+           or match.group('paren_url') or match.group('url'))
+    return url.strip().rstrip('.,;:') if url else None
+
+
+def emphasized_text(match):
+    """The text inside a bold or italic LINK_PATTERN match, or None for links"""
+    return match.group(match.lastgroup) if match.lastgroup in ('bold', 'italic') else None
+
+
+def link_matches(text):
+    """Yield the LINK_PATTERN matches of links in text, including those inside bold and italic text"""
+    for match in LINK_PATTERN.finditer(text):
+        inner = emphasized_text(match)
+        if inner is None:
+            yield match
+        else:
+            yield from link_matches(inner)
+
+
+def extract_links(markdown_content):
+    """Return the http(s) URLs linked or cited in an article, in order of first appearance"""
+    urls = {}
+    for match in link_matches(markdown_content):
+        url = link_url(match)
+        if url and urlsplit(url).scheme in ("http", "https") and is_valid_url(url):
+            urls.setdefault(url, None)
+    return list(urls)
+
+
+class LinkChecker:
+    """Concurrent link checking through one pooled async HTTP client
+
+    The client lives on its own event loop thread, so checks started by different
+    generations share its connections. Each link gets a HEAD request, and a GET
+    if the HEAD is refused or fails. At most LINK_CHECK_PER_HOST requests go to
+    one host at a time. Results are cached on disk by URL. Like the page fetcher,
+    hosts on non-public addresses are never requested unless allow_private is set.
+    """
+
+    def __init__(self, max_connections=LINK_CHECK_MAX_CONNECTIONS, per_host=LINK_CHECK_PER_HOST,
+                 timeout=LINK_CHECK_TIMEOUT, cache=link_cache, allow_private=FETCH_ALLOW_PRIVATE):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.allow_private = allow_private
+        self._loop = None
+        self._client = None
+        self._host_slots = {}  # Only used on the event loop thread
+        self._lock = threading.Lock()
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                import httpx
+
+                self._client = httpx.AsyncClient(
+                    follow_redirects=True,
+                    timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections),
+                    headers={"User-Agent": USER_AGENT},
+                    # Request hooks also run for every redirect
+                    event_hooks={"request": [] if self.allow_private else [self._ensure_public]},
+                )
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="link-check", daemon=True).start()
+            return self._loop
+
+    async def _ensure_public(self, request):
+        await ensure_public_url_async(request.url)
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def _check(self, url):
+        """Return {"url", "state", "status", "error", "checked"}, state being "ok", "dead" or "unverified" """
+        import httpx
+
+        status = error = None
+        async with self._host_slot(url):
+            try:
+                status = (await self._client.head(url)).status_code
+            except BlockedURLError as e:
+                error = e
+            except httpx.HTTPError:
+                pass
+            if error is None and (status is None or status >= 400):
+                # Some servers refuse or mishandle HEAD. The body is never read
+                try:
+                    async with self._client.stream("GET", url) as response:
+                        status = response.status_code
+                except (httpx.HTTPError, BlockedURLError) as e:
+                    status, error = None, e
+
+        if status is None:
+            state = "unverified"
+        else:
+            state = "ok" if status < 400 else "dead" if status in DEAD_STATUSES else "unverified"
+        return {"url": url, "state": state, "status": status,
+                "error": (str(error) or type(error).__name__) if error else None, "checked": time.time()}
+
+    async def _check_all(self, urls):
+        return await asyncio.gather(*(self._check(url) for url in urls))
+
+    def check_many(self, urls):
+        """Return {url: result} for urls, checking the ones not in the cache at the same time"""
+        results = {}
+        pending = []
+        now = time.time()
+        for url in dict.fromkeys(urls):
+            cached = self.cache.get(url)
+            if cached is not None and (cached["state"] == "ok" or now - cached["checked"] < LINK_DEAD_CACHE_TTL):
+                record("link_cache_hits")
+                results[url] = cached
+            else:
+                pending.append(url)
+
+        if pending:
+            record("link_cache_misses", len(pending))
+            future = asyncio.run_coroutine_threadsafe(self._check_all(pending), self._get_loop())
+            for result in future.result():
+                results[result["url"]] = result
+                if result["state"] != "unverified":
+                    self.cache.set(result["url"], result)
+        return results
+
+
+link_checker = LinkChecker()
+
+
+def mark_dead_links(markdown_content, dead, strip=False):
+    """Annotate the citations of dead URLs, or remove them with strip=True
+
+    Stripped markdown links keep their text. List items that only held dead links,
+    such as References entries, are dropped, and so is a References heading left
+    without entries. Dead links inside bold or italic text are annotated after it.
+    """
+    def replace(match):
+        inner = emphasized_text(match)
+        if inner is not None:
+            if not strip:
+                dead_inside = any(link_url(link) in dead for link in link_matches(inner))
+                return match.group(0) + DEAD_LINK_NOTE if dead_inside else match.group(0)
+            marker = match.group(0)[:len(match.group(0)) - len(match.group(0).lstrip('*'))]
+            inner = LINK_PATTERN.sub(replace, inner)
+            return f"{marker}{inner.strip()}{marker}" if inner.strip() else ''
+        url = link_url(match)
+        if url is None or url not in dead:
+            return match.group(0)
+        if not strip:
+            text = match.group(0)
+            stripped = text.rstrip('.,;:')
+            return stripped + DEAD_LINK_NOTE + text[len(stripped):]
+        if match.group('link_url'):
+            return match.group('link_text')
+        if match.group('url') or match.group('label_url'):
+            return match.group(0)[len(match.group(0).rstrip('.,;:')):]
+        return ''
+
+    lines = []
+    for line in markdown_content.splitlines():
+        marked = LINK_PATTERN.sub(replace, line)
+        if strip and marked != line:
+            marked = EMPTY_PARENTHESES_PATTERN.sub('', marked)
+            if not LIST_MARKER_PATTERN.sub('', marked).strip(' -–:*'):
+                continue
+            marked = SPACES_PATTERN.sub(' ', SPACE_BEFORE_PUNCTUATION_PATTERN.sub(r'\1', marked)).rstrip()
+            marked = DOUBLE_PERIOD_PATTERN.sub('.', marked)
+        lines.append(marked)
+
+    if strip:
+        for index in reversed(range(len(lines))):
+            if REFERENCES_HEADING_PATTERN.match(lines[index].strip()):
+                end = next((i for i in range(index + 1, len(lines)) if lines[i].lstrip().startswith('#')), len(lines))
+                if not any(line.strip() for line in lines[index + 1:end]):
+                    del lines[index:end]
+        while lines and not lines[-1].strip():
+            lines.pop()
+    return "\n".join(lines) + ("\n" if markdown_content.endswith("\n") else "")
+
+
+def verify_citations(markdown_content, mode=CITATION_CHECK, checker=link_checker):
+    """Check every link of an article and annotate or strip the dead ones, per mode"""
+    if mode not in CITATION_CHECK_MODES:
+        raise ValueError(f"Unknown citation check mode {mode!r}, expected one of {CITATION_CHECK_MODES}")
+    if mode == "off":
+        return markdown_content
+    urls = extract_links(markdown_content)
+    if not urls:
+        return markdown_content
+
+    with stage("citation_check"):
+        results = checker.check_many(urls)
+    record("links_checked", len(urls))
+    if all(result["status"] is None for result in results.values()):
+        # Not a single server answered, so the network is down rather than the links
+        record("citation_check_unreachable")
+        return markdown_content
+    dead = {url for url, result in results.items() if result["state"] == "dead"}
+    record("dead_links", len(dead))
+    if not dead:
+        return markdown_content
+    return mark_dead_links(markdown_content, dead, strip=mode == "strip")
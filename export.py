@@ -0,0 +1,429 @@
+import copy
+import hashlib
+import html
+import io
+import os
+import re
+from urllib.parse import urlsplit
+
+from cache import DiskCache
+from metrics import record, record_size, stage
+
+# python-docx is imported inside markdown_to_docx, only when a Word export is requested
+
+# Export cache settings (override in .env). Entries are evicted least recently used
+# first once their total size passes the limit
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+export_cache = DiskCache("exports", max_entries=None, max_bytes=EXPORT_CACHE_MAX_BYTES)
+
+# Patterns are compiled once at import time and each markdown line is scanned once
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\s-]')
+FILENAME_SEPARATORS = re.compile(r'[-\s]+')
+NUMBERED_ITEM_PATTERN = re.compile(r'\d+\. ')
+BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+
+# Inline markdown, matched left to right in a single scan. Alternatives are tried in
+# order at each position, so markdown links win over the plain URL inside them.
+# Bold and italic text is scanned again for the links inside it
+INLINE_PATTERN = re.compile(
+    r'\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)]+)\)'  # [text](url)
+    r'|Link\s+\((?P<paren_url>https?://[^)\s]+)\)'  # "Link (url)", common in AI generated content
+    r'|\*\*(?P<bold>.*?)\*\*'  # **bold**
+    r'|(?<!\*)\*(?P<italic>[^*]+)\*(?!\*)'  # *italic*
+    r'|(?P<url>https?://[^\s\)\],]+)'  # Plain URLs
+)
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+HYPERLINK_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+HYPERLINK_STYLE = "Hyperlink"
+LINK_SCHEMES = ("http", "https", "mailto")
+
+# Headings by markdown prefix: (prefix, docx heading level), longest prefix first
+HEADING_PREFIXES = (('#### ', 3), ('### ', 2), ('## ', 2), ('# ', 1))
+
+def sanitize_filename(topic):
+    """Sanitize topic string to create a safe filename"""
+    # Remove or replace problematic characters
+    sanitized = UNSAFE_FILENAME_CHARS.sub('', topic.strip())  # Keep only alphanumeric, spaces, and hyphens
+    sanitized = FILENAME_SEPARATORS.sub('_', sanitized)  # Replace spaces and multiple hyphens with single underscore
+    sanitized = sanitized.lower()  # Convert to lowercase
+    
+    # Ensure it's not empty and not too long
+    if not sanitized:
+        sanitized = "article"
+    elif len(sanitized) > 50:  # Limit length
+        sanitized = sanitized[:50]
+    
+    return sanitized
+
+class Exporter:
+    """An article format: how to render it and how to offer it for download"""
+
+    def __init__(self, name, label, mime, extension, render, version, cached):
+        self.name = name
+        self.label = label
+        self.mime = mime
+        self.extension = extension
+        self.render = render  # markdown str -> bytes
+        self.version = version  # Bump when the output changes, to invalidate cached exports
+        self.cached = cached
+
+
+EXPORTERS = {}
+
+
+def register_exporter(name, label, mime, extension, version=1, cached=True):
+    """Decorator adding a markdown -> bytes function as an export format"""
+    def register(render):
+        EXPORTERS[name] = Exporter(name, label, mime, extension, render, version, cached)
+        return render
+    return register
+
+
+def export_article(markdown_content, format):
+    """Return markdown_content in format, rendered once per distinct content and shared by every session"""
+    exporter = EXPORTERS[format]
+    if not exporter.cached:
+        return exporter.render(markdown_content)
+
+    key = hashlib.sha256(f"{format}:{exporter.version}:{markdown_content}".encode()).hexdigest()
+    content = export_cache.get(key)
+    if content is not None:
+        record("export_cache_hits")
+        return content
+
+    record("export_cache_misses")
+    with stage(f"{format}_export"):
+        content = exporter.render(markdown_content)
+    record_size(f"{format}_bytes", len(content))
+    export_cache.set(key, content)
+    return content
+
+
+def export_filename(topic, format):
+    return f"{sanitize_filename(topic)}_article{EXPORTERS[format].extension}"
+
+
+@register_exporter("markdown", "📄 Download as Markdown", "text/markdown", ".md", cached=False)
+def markdown_to_bytes(markdown_content):
+    return markdown_content.encode("utf-8")
+
+
+def markdown_to_docx(markdown_content):
+    """Convert markdown content to a DOCX document, without the export cache"""
+    with stage("docx_export"):
+        docx_content = _markdown_to_docx(markdown_content)
+    record_size("docx_bytes", len(docx_content))
+    return docx_content
+
+@register_exporter(
+    "docx", "📝 Download as Word Document",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx", version=2,
+)
+def _markdown_to_docx(markdown_content):
+    from docx import Document
+    from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+    from docx.oxml import OxmlElement
+    from docx.text.paragraph import Paragraph
+
+    doc = Document()
+    body = doc.element.body
+    # Paragraphs are inserted directly before the final section properties.
+    # doc.add_paragraph searches the whole body for them on every call and
+    # resolves the style by name, which makes long documents quadratic
+    section_properties = body.sectPr
+    style_ids = {
+        name: doc.styles[name].style_id
+        for name in ('Heading 1', 'Heading 2', 'Heading 3', 'List Bullet', 'List Number')
+    }
+
+    links = HyperlinkWriter(doc)
+
+    def add_paragraph(text=None, style=None):
+        p = OxmlElement('w:p')
+        if section_properties is not None:
+            section_properties.addprevious(p)
+        else:
+            body.append(p)
+        if style:
+            p.style = style_ids[style]
+        paragraph = Paragraph(p, doc._body)
+        if text:
+            paragraph.add_run(text)
+        return paragraph
+
+    for line in markdown_content.splitlines():
+        line = line.strip()
+        
+        if not line:  # Empty line
+            continue  # Skip empty lines to reduce extra spacing
+            
+        # Handle horizontal separators - add a simple separator
+        if line.startswith('---'):
+            add_paragraph('─' * 50)  # Use a Unicode line character
+            continue
+
+        if line[0] == '#':
+            for prefix, level in HEADING_PREFIXES:
+                if line.startswith(prefix):
+                    # Remove markdown formatting from headings
+                    title = BOLD_PATTERN.sub(r'\1', line[len(prefix):].strip())
+                    heading = add_paragraph(title, f'Heading {level}')
+                    if level == 1:  # H1 - Title
+                        heading.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+                    break
+            # Other lines starting with '#' are unhandled headings and are skipped
+            continue
+
+        if line.startswith('- ') or line.startswith('* '):  # Bullet points
+            add_formatted_text(add_paragraph(style='List Bullet'), line[2:].strip(), links)
+            continue
+
+        numbered = NUMBERED_ITEM_PATTERN.match(line)
+        if numbered:  # Numbered lists
+            add_formatted_text(add_paragraph(style='List Number'), line[numbered.end():].strip(), links)
+            continue
+
+        # Regular paragraph
+        add_formatted_text(add_paragraph(), line, links)
+    
+    # Save to bytes buffer
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def inline_tokens(text, bold=False, italic=False):
+    """Yield (text, url, bold, italic) for the runs of one line, url being None for plain text"""
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        kind = match.lastgroup
+        start = match.start()
+
+        if kind == 'url' and 'Source:' in text[max(0, start - 15):start]:
+            # Keep "Source: URL" citations as plain text rather than hyperlinks
+            continue
+
+        if start > position:
+            yield text[position:start], None, bold, italic
+        position = match.end()
+
+        if kind == 'link_url':
+            yield match.group('link_text'), match.group('link_url'), bold, italic
+        elif kind in ('paren_url', 'url'):
+            yield match.group(kind), match.group(kind), bold, italic
+        elif kind == 'bold':
+            yield from inline_tokens(match.group('bold'), True, italic)
+        else:  # Italic
+            yield from inline_tokens(match.group('italic'), bold, True)
+
+    if position < len(text):
+        yield text[position:], None, bold, italic
+
+def add_formatted_text(paragraph, text, links):
+    """Add text with bold, italic and clickable hyperlinks (via a HyperlinkWriter) to a paragraph"""
+    for run_text, url, bold, italic in inline_tokens(text):
+        if url is not None:
+            links.add(paragraph, url, run_text, bold, italic)
+            continue
+        run = paragraph.add_run(run_text)
+        if bold:
+            run.bold = True
+        if italic:
+            run.italic = True
+
+def is_valid_url(url):
+    """Check that url can be stored as a hyperlink target"""
+    if any(ord(char) < 33 for char in url):  # Whitespace and control characters
+        return False
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    return parts.scheme in LINK_SCHEMES and bool(parts.netloc or parts.scheme == "mailto")
+
+class HyperlinkWriter:
+    """Adds hyperlinks to one document
+
+    Each distinct URL gets a single relationship, looked up in a URL -> rId index
+    (python-docx's relate_to scans every relationship on each call). Link elements
+    are cloned from a prebuilt template whose run properties reference a shared
+    character style, instead of carrying their own color and underline.
+    """
+
+    def __init__(self, doc):
+        from docx.enum.style import WD_STYLE_TYPE
+        from docx.oxml import OxmlElement
+        from docx.shared import RGBColor
+        from docx.enum.text import WD_UNDERLINE
+
+        if HYPERLINK_STYLE not in [style.name for style in doc.styles]:
+            style = doc.styles.add_style(HYPERLINK_STYLE, WD_STYLE_TYPE.CHARACTER)
+            style.font.color.rgb = RGBColor(0x05, 0x63, 0xC1)
+            style.font.underline = WD_UNDERLINE.SINGLE
+        style_id = doc.styles[HYPERLINK_STYLE].style_id
+
+        self.rels = doc.part.rels
+        self.rel_ids = {
+            rel.target_ref: r_id for r_id, rel in self.rels.items()
+            if rel.is_external and rel.reltype == HYPERLINK_RELTYPE
+        }
+        used = [int(r_id[3:]) for r_id in self.rels if r_id.startswith("rId") and r_id[3:].isdigit()]
+        self._next_rel = max(used, default=0) + 1
+
+        # (bold, italic) -> <w:hyperlink><w:r><w:rPr><w:rStyle w:val="Hyperlink"/>[<w:b/>][<w:i/>]</w:rPr>
+        # <w:t/></w:r></w:hyperlink>
+        self._templates = {}
+        for bold in (False, True):
+            for italic in (False, True):
+                template = OxmlElement("w:hyperlink")
+                run = OxmlElement("w:r")
+                run_properties = OxmlElement("w:rPr")
+                run_properties.append(OxmlElement("w:rStyle", {f"{W_NS}val": style_id}))
+                if bold:
+                    run_properties.append(OxmlElement("w:b"))
+                if italic:
+                    run_properties.append(OxmlElement("w:i"))
+                run.append(run_properties)
+                run.append(OxmlElement("w:t"))
+                template.append(run)
+                self._templates[bold, italic] = template
+
+    def relationship_id(self, url):
+        """Return the rId for url, relating it to the document the first time it is seen"""
+        r_id = self.rel_ids.get(url)
+        if r_id is None:
+            r_id = f"rId{self._next_rel}"
+            self._next_rel += 1
+            self.rels.add_relationship(HYPERLINK_RELTYPE, url, r_id, is_external=True)
+            self.rel_ids[url] = r_id
+        return r_id
+
+    def add(self, paragraph, url, text, bold=False, italic=False):
+        """Append a clickable link to paragraph, or underlined text if url is not a valid target"""
+        if not is_valid_url(url):
+            run = paragraph.add_run(text)
+            run.underline = True
+            if bold:
+                run.bold = True
+            if italic:
+                run.italic = True
+            return
+
+        hyperlink = copy.deepcopy(self._templates[bold, italic])
+        hyperlink.set(R_ID, self.relationship_id(url))
+        hyperlink[0][1].text = text  # w:r/w:t
+        paragraph._p.append(hyperlink)
+
+
+def markdown_blocks(markdown_content):
+    """Yield (kind, level, text) for each line the exporters render
+
+    kind is "heading" (level 1-4), "bullet", "number", "rule" or "paragraph".
+    Blank lines and deeper headings are skipped, as in the Word export.
+    """
+    for line in markdown_content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('---'):
+            yield "rule", 0, ""
+        elif line[0] == '#':
+            for prefix, _ in HEADING_PREFIXES:
+                if line.startswith(prefix):
+                    yield "heading", len(prefix) - 1, BOLD_PATTERN.sub(r'\1', line[len(prefix):].strip())
+                    break
+        elif line.startswith('- ') or line.startswith('* '):
+            yield "bullet", 0, line[2:].strip()
+        else:
+            numbered = NUMBERED_ITEM_PATTERN.match(line)
+            if numbered:
+                yield "number", 0, line[numbered.end():].strip()
+            else:
+                yield "paragraph", 0, line
+
+
+def inline_html(text):
+    """Render bold, italic and links of one line as escaped HTML, following add_formatted_text"""
+    parts = []
+    for run_text, url, bold, italic in inline_tokens(text):
+        if url is None:
+            part = html.escape(run_text)
+        elif is_valid_url(url):
+            part = f'<a href="{html.escape(url)}">{html.escape(run_text)}</a>'
+        else:
+            part = f'<u>{html.escape(run_text)}</u>'
+        if italic:
+            part = f'<em>{part}</em>'
+        if bold:
+            part = f'<strong>{part}</strong>'
+        parts.append(part)
+    return "".join(parts)
+
+
+@register_exporter("html", "🌐 Download as HTML", "text/html", ".html", version=2)
+def markdown_to_html(markdown_content):
+    """Convert markdown content to a standalone HTML page"""
+    title = "Article"
+    body = []
+    open_list = None
+    for kind, level, text in markdown_blocks(markdown_content):
+        list_tag = {"bullet": "ul", "number": "ol"}.get(kind)
+        if open_list != list_tag:
+            if open_list:
+                body.append(f"</{open_list}>")
+            if list_tag:
+                body.append(f"<{list_tag}>")
+            open_list = list_tag
+
+        if kind == "heading":
+            if level == 1 and title == "Article":
+                title = text
+            body.append(f"<h{level}>{html.escape(text)}</h{level}>")
+        elif kind == "rule":
+            body.append("<hr>")
+        elif list_tag:
+            body.append(f"<li>{inline_html(text)}</li>")
+        else:
+            body.append(f"<p>{inline_html(text)}</p>")
+    if open_list:
+        body.append(f"</{open_list}>")
+
+    page = (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(title)}</title>\n</head>\n<body>\n" + "\n".join(body) + "\n</body>\n</html>\n"
+    )
+    return page.encode("utf-8")
+
+
+def inline_text(text):
+    """Strip inline markdown from one line, keeping link targets in parentheses"""
+    def replace(match):
+        kind = match.lastgroup
+        if kind == 'link_url':
+            return f"{match.group('link_text')} ({match.group('link_url')})"
+        return match.group(kind)
+    return INLINE_PATTERN.sub(replace, text)
+
+
+@register_exporter("text", "🗒️ Download as plain text", "text/plain", ".txt")
+def markdown_to_text(markdown_content):
+    """Convert markdown content to plain text"""
+    lines = []
+    number = 0
+    for kind, level, text in markdown_blocks(markdown_content):
+        number = number + 1 if kind == "number" else 0
+        if kind == "heading":
+            lines += ["", text.upper() if level == 1 else text, ""]
+        elif kind == "rule":
+            lines += ["", "─" * 50, ""]
+        elif kind == "bullet":
+            lines.append(f"• {inline_text(text)}")
+        elif kind == "number":
+            lines.append(f"{number}. {inline_text(text)}")
+        else:
+            lines += [inline_text(text), ""]
+    text = BLANK_LINES_PATTERN.sub('\n\n', "\n".join(lines))
+    return (text.strip() + "\n").encode("utf-8")
@@ -0,0 +1,284 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from cache import DiskCache
+from metrics import record, stage, submit_in_context
+
+# Source page fetching settings (override in .env)
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", 16))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", 2))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 10))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", 2 * 1024 * 1024))
+PAGE_MAX_CHARS = int(os.getenv("PAGE_MAX_CHARS", 4000))
+# Cached pages are served without a request while fresh, then revalidated by ETag
+PAGE_CACHE_FRESHNESS = int(os.getenv("PAGE_CACHE_FRESHNESS", 60 * 60))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", 7 * 24 * 60 * 60))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", 5000))
+# URLs come from the agent and the pages it reads, so by default only hosts on
+# public addresses are requested. "1" also allows loopback, private and
+# link-local addresses, for intranet sources
+FETCH_ALLOW_PRIVATE = os.getenv("FETCH_ALLOW_PRIVATE", "0") == "1"
+
+USER_AGENT = "Mozilla/5.0 (compatible; ai-blog-generator)"
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# Elements whose text is never part of the main content
+SKIPPED_TAGS = frozenset(["script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"])
+# Elements that end a block of text
+BLOCK_TAGS = frozenset(["p", "div", "section", "article", "main", "li", "br", "tr", "blockquote", "pre",
+                        "h1", "h2", "h3", "h4", "h5", "h6"])
+MAIN_TAGS = frozenset(["article", "main"])
+
+page_cache = DiskCache("pages", ttl=PAGE_CACHE_TTL, max_entries=PAGE_CACHE_MAX_ENTRIES)
+
+
+class BlockedURLError(ValueError):
+    """Raised for URLs whose host is not on a public address"""
+
+
+def is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%', 1)[0])  # Without an IPv6 zone id
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def url_host(url):
+    parts = urlsplit(str(url))
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise BlockedURLError(f"not an http(s) URL: {url}")
+    return parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+
+def check_addresses(host, infos):
+    for info in infos:
+        address = info[4][0]
+        if not is_public_address(address):
+            raise BlockedURLError(f"{host} is not on a public address ({address})")
+
+
+def ensure_public_url(url):
+    """Raise BlockedURLError unless every address of url's host is public
+
+    Unknown hosts pass, so the request itself fails with the usual connection error.
+    """
+    host, port = url_host(url)
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return
+    check_addresses(host, infos)
+
+
+async def ensure_public_url_async(url):
+    """ensure_public_url without blocking the event loop on the DNS lookup"""
+    host, port = url_host(url)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return
+    check_addresses(host, infos)
+
+
+class TextExtractor(HTMLParser):
+    """Incremental main text extraction from HTML fed in chunks
+
+    Text inside <article> or <main> is preferred when the page has any. Feeding
+    can stop as soon as `full` is set, so the rest of a long page is never read.
+    """
+
+    def __init__(self, max_chars=PAGE_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = ""
+        self._in_title = False
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._block = []
+        self.blocks = []  # (in main content, text)
+        self.main_chars = 0
+        self.chars = 0
+
+    @property
+    def full(self):
+        # Without <article> or <main> so far, a few times the limit is enough to pick from
+        return self.main_chars >= self.max_chars or self.chars >= 4 * self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in MAIN_TAGS:
+            self._end_block()
+            self._main_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in MAIN_TAGS:
+            self._end_block()
+            self._main_depth = max(0, self._main_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._block.append(data)
+
+    def _end_block(self):
+        text = " ".join("".join(self._block).split())
+        self._block = []
+        if text:
+            in_main = self._main_depth > 0
+            self.blocks.append((in_main, text))
+            self.chars += len(text)
+            if in_main:
+                self.main_chars += len(text)
+
+    def text(self):
+        """The main text, limited to max_chars"""
+        self._end_block()
+        blocks = [text for in_main, text in self.blocks if in_main] or [text for _, text in self.blocks]
+        text = "\n".join(blocks)
+        return text[:self.max_chars]
+
+
+class PageFetcher:
+    """Concurrent fetching of source pages through one pooled keep-alive HTTP client
+
+    At most FETCH_PER_HOST requests go to one host at a time. Extracted text is
+    cached on disk by URL and revalidated with the page's ETag or Last-Modified.
+    Unless allow_private is set, every request, including each redirect, is
+    refused when its host resolves to a non-public address.
+    """
+
+    def __init__(self, max_connections=FETCH_MAX_CONNECTIONS, per_host=FETCH_PER_HOST, timeout=FETCH_TIMEOUT,
+                 max_chars=PAGE_MAX_CHARS, cache=page_cache, allow_private=FETCH_ALLOW_PRIVATE):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.cache = cache
+        self.allow_private = allow_private
+        self._client = None
+        self._executor = None
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+
+                self._client = httpx.Client(
+                    follow_redirects=True,
+                    timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections),
+                    headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9"},
+                    # Request hooks also run for every redirect
+                    event_hooks={"request": [] if self.allow_private else [lambda request: ensure_public_url(request.url)]},
+                )
+                self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="fetch")
+            return self._client
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def fetch(self, url):
+        """Return {"url", "title", "text"} for url, or {"url", "error"} if it cannot be read"""
+        if urlsplit(url).scheme not in ("http", "https"):
+            return {"url": url, "error": "not an http(s) URL"}
+
+        cached = self.cache.get(url)
+        if cached is not None and time.time() - cached["fetched"] < PAGE_CACHE_FRESHNESS:
+            record("page_cache_hits")
+            return cached["page"]
+
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        client = self._get_client()
+        try:
+            with self._host_slot(url), client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    record("page_cache_revalidated")
+                    cached["fetched"] = time.time()
+                    self.cache.set(url, cached)
+                    return cached["page"]
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if content_type and content_type not in TEXT_CONTENT_TYPES:
+                    raise ValueError(f"unsupported content type {content_type}")
+                page = self._extract(response, url, content_type)
+        except BlockedURLError as e:
+            # Raised by the request hook, for the URL or one it redirects to
+            record("page_fetch_blocked")
+            return {"url": url, "error": str(e)}
+        except Exception as e:
+            record("page_fetch_errors")
+            return {"url": url, "error": str(e) or type(e).__name__}
+
+        record("page_cache_misses")
+        self.cache.set(url, {
+            "page": page,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched": time.time(),
+        })
+        return page
+
+    def _extract(self, response, url, content_type):
+        """Read the body in chunks until enough main text is extracted"""
+        received = 0
+        if content_type == "text/plain":
+            parts = []
+            for chunk in response.iter_text():
+                parts.append(chunk)
+                received += len(chunk)
+                if received >= self.max_chars or received >= FETCH_MAX_BYTES:
+                    break
+            return {"url": url, "title": "", "text": "".join(parts)[:self.max_chars].strip()}
+
+        extractor = TextExtractor(self.max_chars)
+        for chunk in response.iter_text():
+            extractor.feed(chunk)
+            received += len(chunk)
+            if extractor.full or received >= FETCH_MAX_BYTES:
+                break
+        return {"url": url, "title": " ".join(extractor.title.split()), "text": extractor.text()}
+
+    def fetch_many(self, urls):
+        """Fetch urls concurrently and return their pages in the same order, duplicates fetched once"""
+        unique = list(dict.fromkeys(urls))
+        self._get_client()
+        with stage("page_fetch"):
+            futures = {url: submit_in_context(self._executor, self.fetch, url) for url in unique}
+            pages = {url: future.result() for url, future in futures.items()}
+        return [pages[url] for url in urls]
+
+
+page_fetcher = PageFetcher()
@@ -0,0 +1,687 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from cache import DiskCache
+from citations import CITATION_CHECK, verify_citations
+from metrics import current_run, record, record_size, stage, submit_in_context, track_run
+from outline import parse_outline, research_slice, stitch_article
+from ratelimit import is_retryable, llm_limiter
+from research import compact_research_brief, estimate_tokens, merge_research_briefs
+from research_store import RESEARCH_FRESHNESS, research_store
+from tools import get_search_tool, get_source_pages_tool
+
+# crewai is imported inside the functions below: it takes several seconds to load
+# and is only needed once a generation actually runs
+
+# The provider prefix routes the model through LiteLLM to Cohere. crewai sends
+# unprefixed names it does not know to OpenAI
+DEFAULT_MODEL = "cohere/command-r"
+DEFAULT_TEMPERATURE = 0.7
+
+# "single": one analyst researches every area in turn
+# "parallel": one analyst per focus area, run concurrently and merged into one brief
+RESEARCH_MODES = ("single", "parallel")
+DEFAULT_RESEARCH_MODE = os.getenv("RESEARCH_MODE", "single")
+
+# "single": the writer writes the whole post in one task
+# "sections": the writer outlines the post, then every section is written concurrently
+WRITING_MODES = ("single", "sections")
+DEFAULT_WRITING_MODE = os.getenv("WRITING_MODE", "single")
+
+# Agent and task definitions. {topic} is filled in by crew.kickoff(inputs=...)
+RESEARCH_ANALYST = {
+    "role": "Senior Research Analyst",
+    "goal": "Research, analyze, and synthesize comprehensive information on {topic} from reliable web sources",
+    "backstory": "You're an expert research analyst with advanced web research skills. "
+            "You excel at finding, analyzing, and synthesizing information from "
+            "across the internet using search tools. You're skilled at "
+            "distinguishing reliable sources from unreliable ones, "
+            "fact-checking, cross-referencing information, and "
+            "identifying key patterns and insights. You provide "
+            "well-organized research briefs with proper citations "
+            "and source verification. Your analysis includes both "
+            "raw data and interpreted insights, making complex "
+            "information accessible and actionable.",
+}
+
+CONTENT_WRITER = {
+    "role": "Content Writer",
+    "goal": "Transform research findings into engaging blog posts while maintaining accuracy",
+    "backstory": "You're a skilled content writer specialized in creating "
+            "engaging, accessible content from technical research. "
+            "You work closely with the Senior Research Analyst and excel at maintaining the perfect "
+            "balance between informative and entertaining writing, "
+            "while ensuring all facts and citations from the research "
+            "are properly incorporated. You have a talent for making "
+            "complex topics approachable without oversimplifying them.",
+}
+
+RESEARCH_TASK = {
+    "description": """
+            1. Conduct comprehensive research on {topic} including:
+                - Recent developments and news
+                - Key industry trends and innovations
+                - Expert opinions and analyses
+                - Statistical data and market insights
+            2. Read the most relevant result pages together with the source page tool
+               instead of relying on search snippets alone
+            3. Evaluate source credibility and fact-check all information
+            4. Organize findings into a structured research brief
+            5. Include all relevant citations and sources
+        """,
+    "expected_output": """A detailed research report containing:
+            - Executive summary of key findings
+            - Comprehensive analysis of current trends and developments
+            - List of verified facts and statistics
+            - All citations and links to original sources
+            - Clear categorization of main themes and patterns
+            Please format with clear sections and bullet points for easy reference.""",
+}
+
+# Focus areas of the parallel research mode, one analyst each
+RESEARCH_FOCUS_AREAS = {
+    "news": "Recent developments and news",
+    "trends": "Key industry trends and innovations",
+    "opinions": "Expert opinions and analyses",
+    "statistics": "Statistical data and market insights",
+}
+
+# {focus} is replaced per area before the task is built
+FOCUSED_RESEARCH_TASK = {
+    "description": """
+            1. Conduct focused research on {topic}, covering only:
+                - {focus}
+            2. Read the most relevant result pages together with the source page tool
+               instead of relying on search snippets alone
+            3. Evaluate source credibility and fact-check all information
+            4. Organize findings into a concise research brief
+            5. Include all relevant citations and sources
+        """,
+    "expected_output": """A focused research report containing:
+            - Key findings for the assigned area
+            - List of verified facts and statistics
+            - All citations and links to original sources
+            Please format with bullet points for easy reference.""",
+}
+
+WRITING_TASK = {
+    "description": """
+            Using the research brief provided, create an engaging blog post about {topic} that:
+            1. Transforms technical information into accessible content
+            2. Maintains all factual accuracy and citations from the research
+            3. Includes:
+                - Attention-grabbing introduction
+                - Well-structured body sections with clear headings
+                - Compelling conclusion
+            4. Preserves all source citations in [Source: URL] format, looking up the
+               brief's [n] citation markers in its Sources table
+            5. Includes a References section at the end
+
+            Research brief:
+            {research_brief}
+        """,
+    "expected_output": """A polished blog post in markdown format that:
+            - Engages readers while maintaining accuracy
+            - Contains properly structured sections
+            - Includes Inline citations hyperlinked to the original source url
+            - Presents information in an accessible yet informative way
+            - Follows proper markdown formatting, use H1 for the title and H3 for the sub-sections""",
+}
+
+# Most sections written from one outline, and most writer crews one article runs
+# at once in the sections mode (override in .env)
+WRITING_MAX_SECTIONS = int(os.getenv("WRITING_MAX_SECTIONS", 6))
+WRITING_MAX_CONCURRENCY = int(os.getenv("WRITING_MAX_CONCURRENCY", 8))
+
+# Writing tasks of the sections mode. {title}, {outline}, {heading}, {points} and
+# {research_slice} are filled in from the parsed outline
+OUTLINE_TASK = {
+    "description": """
+            Plan a blog post about {topic}, from the research brief provided:
+            1. Choose a title and 3 to 6 body sections that together cover the key findings
+            2. Under each section, list the points it makes, each followed by the brief's
+               [n] citation markers it draws on
+            3. Leave out the introduction, conclusion and references, they are written separately
+
+            Research brief:
+            {research_brief}
+        """,
+    "expected_output": """An outline in markdown and nothing else:
+            # Title of the post
+            ### First section heading
+            - A point the section makes [1][3]
+            ### Second section heading
+            - ...""",
+}
+
+SECTION_TASK = {
+    "description": """
+            Write one section of a blog post about {topic}, titled "{title}", that:
+            1. Starts with the heading line "### {heading}" and makes these points:
+            {points}
+            2. Transforms technical information into accessible content, using only the research below
+            3. Preserves all source citations in [Source: URL] format, looking up the
+               research's [n] citation markers in its Sources table
+            4. Leaves the other sections of the outline to their own writers, and has no
+               introduction, conclusion or References section of its own
+
+            Outline of the whole post:
+            {outline}
+
+            Research:
+            {research_slice}
+        """,
+    "expected_output": """The section in markdown, starting with its H3 heading, with inline citations
+            hyperlinked to the original source url""",
+}
+
+# Parts written alongside the sections, one task each. {part} is replaced before the task is built
+FRAMING_PARTS = {
+    "introduction": "an attention-grabbing introduction that leads into the sections",
+    "conclusion": "a compelling conclusion that ties the sections together",
+}
+
+FRAMING_TASK = {
+    "description": """
+            Write {part} for a blog post about {topic}, titled "{title}", that:
+            1. Fits the outline below, so it reads as one piece with the sections written from it
+            2. Is one to three paragraphs, without a heading, citations or References section
+
+            Outline:
+            {outline}
+        """,
+    "expected_output": "The {part} in markdown, without a heading",
+}
+
+# Research briefs are compacted before they reach the writer, then trimmed to
+# this many estimated tokens, 0 = no limit (override in .env)
+RESEARCH_BRIEF_TOKEN_BUDGET = int(os.getenv("RESEARCH_BRIEF_TOKEN_BUDGET", 3000))
+
+# Times a crew is run again after a provider error that outlasted the per-call
+# retries, or ended a streamed call, so the stages that already finished are kept
+# (override in .env)
+TASK_RETRIES = int(os.getenv("TASK_RETRIES", 1))
+
+# Result cache settings (override in .env)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 24 * 60 * 60))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 500))
+RESULT_MEMORY_CACHE_SIZE = int(os.getenv("RESULT_MEMORY_CACHE_SIZE", 32))
+
+
+class GenerationResult:
+    """Final article of a generation run, shared by fresh and cached results"""
+
+    def __init__(self, topic, raw, cached=False, metrics=None):
+        self.topic = topic
+        self.raw = raw
+        self.cached = cached
+        self.metrics = metrics or {}  # RunMetrics.to_dict() of the run that returned this
+
+    def __str__(self):
+        return self.raw
+
+
+class ResultCache:
+    """In-memory LRU tier in front of a DiskCache, with coalescing of concurrent misses"""
+
+    def __init__(self, disk, memory_size):
+        self.disk = disk
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        raw = self.disk.get(key)
+        if raw is not None:
+            self._remember(key, raw)
+        return raw
+
+    def _remember(self, key, raw):
+        with self._lock:
+            self._memory[key] = raw
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def get_or_compute(self, key, compute, force=False):
+        """Return (raw, cached) for key, running compute() at most once per key at a time"""
+        if not force:
+            raw = self._get(key)
+            if raw is not None:
+                return raw, True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            # Another session is already generating this key, wait for its result
+            return future.result(), True
+
+        try:
+            # The previous owner may have finished between the cache miss and taking its place
+            raw = None if force else self._get(key)
+            if raw is not None:
+                future.set_result(raw)
+                return raw, True
+            raw = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.disk.set(key, raw)
+            self._remember(key, raw)
+            future.set_result(raw)
+            return raw, False
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+result_cache = ResultCache(
+    DiskCache("results", ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES),
+    RESULT_MEMORY_CACHE_SIZE,
+)
+
+
+def normalize_topic(topic):
+    """Normalize a topic so whitespace and case differences share a cache entry"""
+    return " ".join(topic.lower().split())
+
+
+def prompt_fingerprint():
+    """Hash of the agent and task definitions, so prompt edits invalidate cached results"""
+    definitions = [RESEARCH_ANALYST, CONTENT_WRITER, RESEARCH_TASK, RESEARCH_FOCUS_AREAS, FOCUSED_RESEARCH_TASK, WRITING_TASK,
+                   OUTLINE_TASK, SECTION_TASK, FRAMING_PARTS, FRAMING_TASK]
+    return hashlib.sha256(json.dumps(definitions, sort_keys=True).encode()).hexdigest()
+
+
+def result_cache_key(topic, model, temperature, research_mode, writing_mode=DEFAULT_WRITING_MODE):
+    params = {
+        "topic": normalize_topic(topic),
+        "model": model,
+        "temperature": round(float(temperature), 3),
+        "research_mode": research_mode,
+        "writing_mode": writing_mode,
+        "brief_token_budget": RESEARCH_BRIEF_TOKEN_BUDGET,
+        "citation_check": CITATION_CHECK,
+        "prompts": prompt_fingerprint(),
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+@contextmanager
+def progress_events(stages, on_progress):
+    """Forward crew events for the given {stage name: task} mapping to on_progress(event, detail)
+
+    Events are "task_started" / "task_completed" (detail: stage name), "tool_started" /
+    "tool_finished" (detail: tool name and arguments) and "token" (detail: a streamed chunk
+    of the writer's output). find_or_run_research adds "research_reused" (detail: the
+    similar topic whose brief is used) and run_with_task_retries "task_retry" (detail:
+    the stage that is started again, whose streamed tokens are void). Handlers run on
+    crewai's event threads, and the event bus is shared by every crew in the process,
+    so events from other runs are filtered out.
+    LLM calls, token usage and tool calls are also counted on the current metrics run.
+    """
+    # Captured here because the handlers run on threads without this context
+    run = current_run.get()
+    if on_progress is None and run is None:
+        # Only crews run outside generate_content, without a listener, skip the event bus
+        yield
+        return
+
+    def notify(event, detail):
+        if on_progress is not None:
+            on_progress(event, detail)
+
+    from crewai.events import crewai_event_bus
+    from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMStreamChunkEvent
+    from crewai.events.types.task_events import TaskCompletedEvent, TaskStartedEvent
+    from crewai.events.types.tool_usage_events import ToolUsageFinishedEvent, ToolUsageStartedEvent
+
+    task_stages = {str(task.id): name for name, task in stages.items()}
+    agent_stages = {str(task.agent.id): name for name, task in stages.items()}
+
+    def on_task_started(source, event):
+        if event.task_id in task_stages:
+            notify("task_started", task_stages[event.task_id])
+
+    def on_task_completed(source, event):
+        if event.task_id in task_stages:
+            notify("task_completed", task_stages[event.task_id])
+
+    def on_tool_started(source, event):
+        if event.agent_id in agent_stages:
+            notify("tool_started", f"{event.tool_name}: {event.tool_args}")
+
+    def on_tool_finished(source, event):
+        if event.agent_id in agent_stages:
+            record("tool_calls", run=run)
+            notify("tool_finished", event.tool_name)
+
+    def on_chunk(source, event):
+        stage = task_stages.get(event.task_id) or agent_stages.get(event.agent_id)
+        if stage == "writing" and not event.tool_call:
+            notify("token", event.chunk)
+
+    def on_llm_call(source, event):
+        if event.task_id in task_stages or event.agent_id in agent_stages:
+            usage = event.usage or {}
+            record("llm_calls", run=run)
+            record("prompt_tokens", usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0, run=run)
+            record("completion_tokens", usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0, run=run)
+
+    # Every generation is measured, but batch and API runs without a listener only
+    # need the counting handlers, so streamed chunks are not dispatched to them
+    handlers = [
+        (ToolUsageFinishedEvent, on_tool_finished),
+        (LLMCallCompletedEvent, on_llm_call),
+    ]
+    if on_progress is not None:
+        handlers += [
+            (TaskStartedEvent, on_task_started),
+            (TaskCompletedEvent, on_task_completed),
+            (ToolUsageStartedEvent, on_tool_started),
+            (LLMStreamChunkEvent, on_chunk),
+        ]
+    for event_type, handler in handlers:
+        crewai_event_bus.on(event_type)(handler)
+    try:
+        yield
+    finally:
+        for event_type, handler in handlers:
+            crewai_event_bus.off(event_type, handler)
+
+
+@functools.cache
+def rate_limited_llm_class(llm_class):
+    """Subclass of a crewai LLM class whose calls are paced and retried by llm_limiter
+
+    Streamed calls are not retried here: the chunks sent before a failure would be
+    sent again. They fail to run_with_task_retries, which restarts the task and
+    tells the listener, so the draft is cleared.
+    """
+    class RateLimitedLLM(llm_class):
+        def call(self, *args, **kwargs):
+            if self.stream:
+                return llm_limiter.call_once(super().call, *args, **kwargs)
+            return llm_limiter.call(super().call, *args, **kwargs)
+
+    RateLimitedLLM.__name__ = f"RateLimited{llm_class.__name__}"
+    return RateLimitedLLM
+
+
+@functools.lru_cache(maxsize=16)
+def get_llm(model, temperature, stream=False):
+    """Return the process-wide LLM client for these settings, so its HTTP connections are reused"""
+    from crewai import LLM
+
+    llm = LLM(
+        model=model,
+        temperature=temperature,
+        stream=stream
+    )
+    # LLM() picks the provider class, so the rate limited subclass is applied afterwards
+    llm.__class__ = rate_limited_llm_class(type(llm))
+    return llm
+
+
+def run_with_task_retries(name, run, on_progress=None):
+    """Call run(), calling it again up to TASK_RETRIES times if a provider call keeps failing"""
+    for attempt in range(TASK_RETRIES + 1):
+        try:
+            return run()
+        except Exception as e:
+            if attempt >= TASK_RETRIES or not is_retryable(e):
+                raise
+            record("task_retries")
+            if on_progress is not None:
+                on_progress("task_retry", name)
+
+
+def build_research_crew(model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, focus=None):
+    """Build a research crew, returning it with its {stage name: task} mapping
+
+    Without focus the analyst covers every area of RESEARCH_TASK. With a key of
+    RESEARCH_FOCUS_AREAS it researches only that area, for the parallel mode.
+    LLM clients and the search tool are shared across runs. Agents and tasks are
+    cheap to build but are modified by crew.kickoff, so every run gets its own.
+    """
+    from crewai import Agent, Task, Crew
+
+    # Senior Research Analyst
+    senior_research_analyst = Agent(
+        **RESEARCH_ANALYST,
+        allow_delegation=False,
+        verbose=True,
+        # Repeated queries are served from the local search cache, and result
+        # pages are read in one concurrent call through the page cache
+        tools=[get_search_tool(n_results=10), get_source_pages_tool()],
+        llm=get_llm(model, temperature)
+    )
+
+    # Research Task
+    if focus is None:
+        stage = "research"
+        research_task = Task(**RESEARCH_TASK, agent=senior_research_analyst)
+    else:
+        stage = f"research ({focus})"
+        research_task = Task(
+            description=FOCUSED_RESEARCH_TASK["description"].replace("{focus}", RESEARCH_FOCUS_AREAS[focus]),
+            expected_output=FOCUSED_RESEARCH_TASK["expected_output"],
+            agent=senior_research_analyst
+        )
+
+    crew = Crew(agents=[senior_research_analyst], tasks=[research_task], verbose=True)
+    return crew, {stage: research_task}
+
+
+def build_writer_crew(stage, task_definition, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, stream=False):
+    """Build a content writer crew for one task definition, returning it with its {stage name: task} mapping"""
+    from crewai import Agent, Task, Crew
+
+    # Content Writer, streaming its tokens when someone is listening for progress
+    content_writer = Agent(
+        **CONTENT_WRITER,
+        allow_delegation=False,
+        verbose=True,
+        llm=get_llm(model, temperature, stream=stream)
+    )
+
+    writing_task = Task(**task_definition, agent=content_writer)
+
+    crew = Crew(agents=[content_writer], tasks=[writing_task], verbose=True)
+    return crew, {stage: writing_task}
+
+
+def build_writing_crew(model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, stream=False):
+    """Build the writing crew, returning it with its {stage name: task} mapping"""
+    return build_writer_crew("writing", WRITING_TASK, model, temperature, stream=stream)
+
+
+def run_research_crew(topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, focus=None, on_progress=None):
+    """Run one research crew, covering every area or only focus, and return its brief"""
+    name = f"research.{focus}" if focus else "research"
+
+    def run():
+        crew, stages = build_research_crew(model, temperature, focus=focus)
+        with stage(name), progress_events(stages, on_progress):
+            return str(crew.kickoff(inputs={"topic": topic}).raw)
+
+    return run_with_task_retries(name, run, on_progress)
+
+
+def run_research(topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, research_mode=DEFAULT_RESEARCH_MODE, on_progress=None):
+    """Research topic and return the research brief as markdown"""
+    if research_mode not in RESEARCH_MODES:
+        raise ValueError(f"Unknown research mode {research_mode!r}, expected one of {RESEARCH_MODES}")
+
+    if research_mode == "single":
+        return run_research_crew(topic, model, temperature, on_progress=on_progress)
+
+    # Every focus area runs as its own crew at the same time, so research takes
+    # about as long as the slowest area instead of the sum of all of them
+    with stage("research"), ThreadPoolExecutor(max_workers=len(RESEARCH_FOCUS_AREAS), thread_name_prefix="research") as executor:
+        futures = {
+            focus: submit_in_context(executor, run_research_crew, topic, model, temperature, focus, on_progress)
+            for focus in RESEARCH_FOCUS_AREAS
+        }
+        briefs = {RESEARCH_FOCUS_AREAS[focus]: future.result() for focus, future in futures.items()}
+    return merge_research_briefs(briefs)
+
+
+def find_or_run_research(topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, research_mode=DEFAULT_RESEARCH_MODE,
+                         on_progress=None, reuse=True):
+    """Return a research brief for topic, reusing the brief of a similar recent topic if there is one
+
+    A match researched or refreshed within RESEARCH_FRESHNESS is used as it is.
+    An older one gets a news-only research run, which replaces its previous news
+    in the store. Otherwise the topic is researched in full and stored.
+    """
+    match = research_store.find(topic, model) if reuse else None
+    if match is None:
+        record("research_store_misses")
+        brief = run_research(topic, model, temperature, research_mode, on_progress)
+        research_store.add(topic, model, brief)
+        return brief
+
+    record_size("research_reuse_similarity", round(match.similarity, 3))
+    if on_progress is not None:
+        on_progress("research_reused", f"{match.topic} ({match.similarity:.0%} similar)")
+    if match.age <= RESEARCH_FRESHNESS:
+        record("research_store_hits")
+        news = match.news
+    else:
+        record("research_store_refreshes")
+        news = run_research_crew(topic, model, temperature, focus="news", on_progress=on_progress)
+        research_store.refresh(match.row_id, news)
+    if news is None:
+        return match.brief
+    return merge_research_briefs({RESEARCH_FOCUS_AREAS["news"]: news, "Earlier research": match.brief})
+
+
+def run_writer_crew(name, stage_name, task_definition, inputs, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                    on_progress=None, stream=False):
+    """Run one content writer task, measured as stage name, and return its output"""
+    def run():
+        crew, stages = build_writer_crew(stage_name, task_definition, model, temperature, stream=stream)
+        with stage(name), progress_events(stages, on_progress):
+            return str(crew.kickoff(inputs=inputs).raw)
+
+    return run_with_task_retries(name, run, on_progress)
+
+
+def run_writing(topic, research_brief, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, on_progress=None):
+    """Write the blog post for topic from research_brief and return it as markdown"""
+    return run_writer_crew(
+        "writing", "writing", WRITING_TASK, {"topic": topic, "research_brief": research_brief}, model, temperature,
+        on_progress, stream=on_progress is not None,
+    )
+
+
+def run_sectioned_writing(topic, research_brief, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, on_progress=None):
+    """Write the blog post from an outline, one section per task, and return it as markdown
+
+    After the outline, every section, the introduction and the conclusion are
+    written at the same time, each section from its own slice of the brief, so
+    writing takes about as long as the longest section instead of the whole post.
+    Sections are not streamed. An outline without sections falls back to run_writing,
+    and sections past WRITING_MAX_SECTIONS are left out.
+    """
+    outline = run_writer_crew(
+        "outline", "outline", OUTLINE_TASK, {"topic": topic, "research_brief": research_brief}, model, temperature,
+        on_progress,
+    )
+    title, sections = parse_outline(outline)
+    if not sections:
+        record("outline_fallbacks")
+        return run_writing(topic, research_brief, model, temperature, on_progress)
+    title = title or topic
+    if len(sections) > WRITING_MAX_SECTIONS:
+        record("outline_sections_dropped", len(sections) - WRITING_MAX_SECTIONS)
+        sections = sections[:WRITING_MAX_SECTIONS]
+    record_size("article_sections", len(sections))
+
+    inputs = {"topic": topic, "title": title, "outline": outline}
+    # Sections first, so the longer parts start first when the pool is smaller than the task count
+    tasks = {}  # stage name -> (progress stage name, task definition, inputs)
+    for number, (heading, points) in enumerate(sections, start=1):
+        section_inputs = {**inputs, "heading": heading, "points": points,
+                          "research_slice": research_slice(research_brief, f"{heading}\n{points}")}
+        tasks[f"writing.section{number}"] = (f"writing ({heading})", SECTION_TASK, section_inputs)
+    for part, description in FRAMING_PARTS.items():
+        task = {key: value.replace("{part}", description) for key, value in FRAMING_TASK.items()}
+        tasks[f"writing.{part}"] = (f"writing ({part})", task, inputs)
+
+    workers = max(1, min(len(tasks), WRITING_MAX_CONCURRENCY))
+    with stage("writing"), ThreadPoolExecutor(max_workers=workers, thread_name_prefix="writing") as executor:
+        futures = {
+            name: submit_in_context(executor, run_writer_crew, name, stage_name, task, task_inputs, model, temperature,
+                                    on_progress)
+            for name, (stage_name, task, task_inputs) in tasks.items()
+        }
+        parts = {name: future.result() for name, future in futures.items()}
+
+    return stitch_article(
+        title,
+        parts["writing.introduction"],
+        [(heading, parts[f"writing.section{number}"]) for number, (heading, _) in enumerate(sections, start=1)],
+        parts["writing.conclusion"],
+    )
+
+
+def run_pipeline(topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, research_mode=DEFAULT_RESEARCH_MODE, on_progress=None,
+                 reuse_research=True, writing_mode=DEFAULT_WRITING_MODE):
+    """Research topic, compact the brief, write from it and check its citations, returning the article markdown"""
+    if writing_mode not in WRITING_MODES:
+        raise ValueError(f"Unknown writing mode {writing_mode!r}, expected one of {WRITING_MODES}")
+    research_brief = find_or_run_research(topic, model, temperature, research_mode, on_progress, reuse=reuse_research)
+    with stage("compaction"):
+        compacted_brief = compact_research_brief(research_brief, RESEARCH_BRIEF_TOKEN_BUDGET)
+
+    tokens_before, tokens_after = estimate_tokens(research_brief), estimate_tokens(compacted_brief)
+    record_size("research_brief_chars", len(research_brief))
+    record_size("research_brief_tokens", tokens_before)
+    record_size("compacted_brief_tokens", tokens_after)
+    record("brief_tokens_saved", tokens_before - tokens_after)
+    if writing_mode == "sections":
+        article = run_sectioned_writing(topic, compacted_brief, model, temperature, on_progress)
+    else:
+        article = run_writing(topic, compacted_brief, model, temperature, on_progress)
+    return verify_citations(article)
+
+
+def generate_content(topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, force=False, on_progress=None,
+                     research_mode=DEFAULT_RESEARCH_MODE, profile=False, writing_mode=DEFAULT_WRITING_MODE):
+    """Generate a blog post for topic, reusing a cached result unless force is set
+
+    on_progress(event, detail) is called as the crews run, see progress_events.
+    Cached results return immediately without any progress events. force also skips
+    the reuse of research from similar topics (see find_or_run_research). Every call is
+    measured (see metrics.track_run), and profile=True also dumps a cProfile of it.
+    """
+    key = result_cache_key(topic, model, temperature, research_mode, writing_mode)
+    with track_run(topic, profile=profile, model=model, temperature=temperature, research_mode=research_mode,
+                   writing_mode=writing_mode) as run:
+        raw, cached = result_cache.get_or_compute(
+            key,
+            lambda: run_pipeline(topic, model, temperature, research_mode, on_progress, reuse_research=not force,
+                                 writing_mode=writing_mode),
+            force=force,
+        )
+        record("result_cache_hits" if cached else "result_cache_misses")
+        record_size("article_chars", len(raw))
+    return GenerationResult(topic, raw, cached=cached, metrics=run.to_dict())
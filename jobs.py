@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import DiskCache
+from generator import DEFAULT_MODEL, DEFAULT_RESEARCH_MODE, DEFAULT_TEMPERATURE, DEFAULT_WRITING_MODE, generate_content
+
+# Job queue settings (override in .env)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 32))
+JOB_TTL = int(os.getenv("JOB_TTL", 7 * 24 * 60 * 60))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """A generation request and everything the page needs to show its progress"""
+
+    def __init__(self, topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, force=False,
+                 research_mode=DEFAULT_RESEARCH_MODE, writing_mode=DEFAULT_WRITING_MODE):
+        self.id = uuid.uuid4().hex
+        self.topic = topic
+        self.model = model
+        self.temperature = temperature
+        self.force = force
+        self.research_mode = research_mode
+        self.writing_mode = writing_mode
+        self.status = QUEUED
+        self.result = None  # GenerationResult once done
+        self.error = None
+        self.log = []  # Human readable stage messages
+        self.draft = ""  # Writer output streamed so far
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def on_progress(self, event, detail):
+        if event == "token":
+            self.draft += detail
+        elif event == "task_started":
+            self.log.append(f"▶️ {detail.capitalize()} started")
+        elif event == "task_completed":
+            self.log.append(f"✅ {detail.capitalize()} done")
+        elif event == "tool_started":
+            self.log.append(f"🔎 {detail}")
+        elif event == "research_reused":
+            self.log.append(f"♻️ Reusing research on {detail}")
+        elif event == "task_retry":
+            self.log.append(f"🔁 {detail.capitalize()} failed on a provider error, retrying")
+            if detail == "writing":
+                self.draft = ""
+
+    def to_record(self):
+        record = dict(vars(self))
+        record["draft"] = ""  # Only useful while running
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls.__new__(cls)
+        vars(job).update(record)
+        return job
+
+
+class JobManager:
+    """Runs generation jobs in a worker pool, independent of Streamlit script reruns"""
+
+    def __init__(self, workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, store=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.store = store if store is not None else DiskCache("jobs", ttl=JOB_TTL, max_entries=10000)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generation-job")
+        self._jobs = {}  # Jobs that have not finished yet in this process
+        self._lock = threading.Lock()
+
+    def submit(self, topic, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, force=False,
+               research_mode=DEFAULT_RESEARCH_MODE, writing_mode=DEFAULT_WRITING_MODE):
+        """Queue a generation and return its job id, or raise QueueFull"""
+        job = Job(topic, model=model, temperature=temperature, force=force, research_mode=research_mode,
+                  writing_mode=writing_mode)
+        with self._lock:
+            if self.queue_depth() >= self.max_queue:
+                raise QueueFull(f"{self.max_queue} jobs are already waiting, please try again shortly")
+            self._jobs[job.id] = job
+        self.store.set(job.id, job.to_record())
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id):
+        """Return the job with job_id from memory or the persistent store, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        record = self.store.get(job_id)
+        if record is None:
+            return None
+        job = Job.from_record(record)
+        if not job.finished:
+            # Persisted as pending by a server process that has since stopped
+            job.status = FAILED
+            job.error = "The server restarted before this job finished, please generate again"
+        return job
+
+    def queue_depth(self):
+        """Number of jobs waiting for a free worker"""
+        return sum(1 for job in list(self._jobs.values()) if job.status == QUEUED)
+
+    def stats(self):
+        jobs = list(self._jobs.values())
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": sum(1 for job in jobs if job.status == QUEUED),
+            "running": sum(1 for job in jobs if job.status == RUNNING),
+        }
+
+    def _run(self, job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = generate_content(
+                job.topic, model=job.model, temperature=job.temperature,
+                force=job.force, on_progress=job.on_progress, research_mode=job.research_mode,
+                writing_mode=job.writing_mode
+            )
+            job.status = DONE
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = FAILED
+        job.finished_at = time.time()
+        self.store.set(job.id, job.to_record())
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+
+job_manager = JobManager()
@@ -0,0 +1,192 @@
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Per-run JSON logs, the Prometheus text file and profiles are written here
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+RUN_LOG_FILE = "runs.jsonl"
+PROMETHEUS_FILE = "blog_generator.prom"
+
+# The run being measured in the current thread. Copied into the threads of
+# crewai's executors and the parallel research pool, so their calls count too
+current_run = contextvars.ContextVar("current_run", default=None)
+
+
+class RunMetrics:
+    """Latency, token, tool call, cache and size measurements of one generation run"""
+
+    def __init__(self, topic, **labels):
+        self.run_id = uuid.uuid4().hex
+        self.topic = topic
+        self.labels = labels
+        self.started_at = time.time()
+        self.status = "running"
+        self.stages = {}  # name -> {"seconds": total, "count": calls}
+        self.counters = defaultdict(int)
+        self.sizes = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "count": 0})
+            stage["seconds"] += seconds
+            stage["count"] += 1
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def set_size(self, name, value):
+        self.sizes[name] = value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "topic": self.topic,
+                "labels": dict(self.labels),
+                "started_at": self.started_at,
+                "status": self.status,
+                "stages": {name: {"seconds": round(s["seconds"], 4), "count": s["count"]} for name, s in self.stages.items()},
+                "counters": dict(self.counters),
+                "sizes": dict(self.sizes),
+            }
+
+
+class Registry:
+    """Process-wide totals across runs, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.stage_seconds = defaultdict(float)
+        self.stage_count = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.runs = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe_stage(self, name, seconds):
+        with self._lock:
+            self.stage_seconds[name] += seconds
+            self.stage_count[name] += 1
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def finish_run(self, status):
+        with self._lock:
+            self.runs[status] += 1
+
+    def render_prometheus(self):
+        with self._lock:
+            lines = [
+                "# HELP blog_stage_seconds Time spent in each pipeline stage.",
+                "# TYPE blog_stage_seconds summary",
+            ]
+            for name in sorted(self.stage_count):
+                lines.append(f'blog_stage_seconds_sum{{stage="{name}"}} {self.stage_seconds[name]:.6f}')
+                lines.append(f'blog_stage_seconds_count{{stage="{name}"}} {self.stage_count[name]}')
+            lines += [
+                "# HELP blog_events_total Tool calls, LLM calls, tokens and cache lookups.",
+                "# TYPE blog_events_total counter",
+            ]
+            for name in sorted(self.counters):
+                lines.append(f'blog_events_total{{event="{name}"}} {self.counters[name]}')
+            lines += [
+                "# HELP blog_runs_total Finished generation runs by status.",
+                "# TYPE blog_runs_total counter",
+            ]
+            for status in sorted(self.runs):
+                lines.append(f'blog_runs_total{{status="{status}"}} {self.runs[status]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage for the process totals and the current run, if any"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        registry.observe_stage(name, seconds)
+        run = current_run.get()
+        if run is not None:
+            run.add_stage(name, seconds)
+
+
+def record(name, amount=1, run=None):
+    """Count an event for the process totals and the given or current run"""
+    registry.incr(name, amount)
+    run = run or current_run.get()
+    if run is not None:
+        run.incr(name, amount)
+
+
+def record_size(name, value):
+    """Record an output size on the current run"""
+    run = current_run.get()
+    if run is not None:
+        run.set_size(name, value)
+
+
+def submit_in_context(executor, function, *args):
+    """executor.submit(function, *args), run in a copy of the caller's context
+
+    Pool threads do not inherit context variables, so without the copy the work
+    would not count towards the caller's current run.
+    """
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def write_outputs(run):
+    """Append the run to the JSON run log and rewrite the Prometheus text file"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with _write_lock:
+        with open(os.path.join(METRICS_DIR, RUN_LOG_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(run.to_dict()) + "\n")
+        # Write then rename, so a scraper never reads a half written file
+        path = os.path.join(METRICS_DIR, PROMETHEUS_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(registry.render_prometheus())
+        os.replace(path + ".tmp", path)
+
+
+@contextmanager
+def track_run(topic, profile=False, **labels):
+    """Measure one generation run and write its metrics when it finishes
+
+    With profile=True the run is also profiled with cProfile and dumped to
+    METRICS_DIR/profiles/<run_id>.prof. cProfile only sees the calling thread,
+    so work in the parallel research threads shows up as waiting time.
+    """
+    run = RunMetrics(topic, **labels)
+    token = current_run.set(run)
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with stage("total"):
+            yield run
+        run.status = "ok"
+    except BaseException:
+        run.status = "error"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile_dir = os.path.join(METRICS_DIR, "profiles")
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_dir, f"{run.run_id}.prof"))
+        current_run.reset(token)
+        registry.finish_run(run.status)
+        write_outputs(run)
@@ -0,0 +1,130 @@
+import re
+
+from research import MARKER_PATTERN, WORD_PATTERN, extract_urls, normalize_line
+
+# Parts of the article that are written separately from the outline's sections
+FRAMING_HEADINGS = frozenset(["introduction", "conclusion", "conclusions", "summary", "references", "sources"])
+SOURCES_ROW_PATTERN = re.compile(r'^\[(\d+)\]\s')
+REFERENCES_HEADING_PATTERN = re.compile(r'^#+\s*\**\s*(references|sources)\b', re.IGNORECASE | re.MULTILINE)
+
+# Words a finding must share with a section's points to count as relevant, when
+# the points cite no markers
+MIN_SHARED_WORDS = 3
+
+
+def heading_text(line):
+    """Text of a markdown heading line, without its level, numbering or emphasis"""
+    text = line.strip().lstrip('#').strip().strip('*').strip()
+    return re.sub(r'^\d+[.)]\s*', '', text).strip('*').strip()
+
+
+def content_words(text):
+    # Short words are mostly stopwords and say little about what a line covers
+    return {word for word in WORD_PATTERN.findall(normalize_line(MARKER_PATTERN.sub('', text))) if len(word) > 3}
+
+
+def parse_outline(outline):
+    """Split an outline into its title and [(section heading, points)]
+
+    The first H1 is the title. H2 and H3 headings start sections, except
+    introductions, conclusions and references, which are written separately.
+    Other headings, such as H4 subheadings, become points of their section.
+    """
+    title = None
+    sections = []
+    for line in outline.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('```'):
+            continue
+        if stripped.startswith('#'):
+            heading = heading_text(stripped)
+            level = len(stripped) - len(stripped.lstrip('#'))
+            if level == 1 and title is None:
+                title = heading
+            elif heading and level in (2, 3):
+                sections.append((heading, []))
+            elif heading and sections:
+                sections[-1][1].append(f"- {heading}")
+        elif sections:
+            sections[-1][1].append(stripped)
+    sections = [
+        (heading, "\n".join(points)) for heading, points in sections
+        if heading.lower().rstrip(':') not in FRAMING_HEADINGS
+    ]
+    return title, sections
+
+
+def research_slice(brief, points):
+    """The findings of a research brief that one outline section draws on, with their sources
+
+    A finding is relevant when it carries one of the [n] markers cited by points,
+    or, for points without markers, when it shares MIN_SHARED_WORDS words with them.
+    Headings above relevant findings and the Sources rows of their markers are
+    kept. Without any relevant finding the whole brief is returned.
+    """
+    markers = set(MARKER_PATTERN.findall(points))
+    words = content_words(points)
+
+    lines = []
+    heading = None
+    cited = set()
+    in_sources = False
+    sources = {}  # marker -> Sources table row
+    for line in brief.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            in_sources = heading_text(stripped).lower() == 'sources'
+            heading = None if in_sources else stripped
+            continue
+        if in_sources:
+            row = SOURCES_ROW_PATTERN.match(stripped)
+            if row:
+                sources[f"[{row.group(1)}]"] = stripped
+            continue
+        if not stripped:
+            continue
+        line_markers = set(MARKER_PATTERN.findall(line))
+        if line_markers & markers if markers else len(content_words(line) & words) >= MIN_SHARED_WORDS:
+            if heading is not None:
+                lines += ["", heading, ""]
+                heading = None
+            lines.append(line.rstrip())
+            cited |= line_markers
+
+    if not lines:
+        return brief
+    rows = [sources[marker] for marker in sorted(cited, key=lambda marker: int(marker[1:-1])) if marker in sources]
+    if rows:
+        lines += ["", "## Sources", ""] + rows
+    return "\n".join(lines).strip() + "\n"
+
+
+def without_references(text):
+    """A written part without the References section a writer may add despite being told not to"""
+    match = REFERENCES_HEADING_PATTERN.search(text)
+    return (text[:match.start()] if match else text).strip()
+
+
+def without_heading(text):
+    """A written part without a leading heading, such as a repeated title or "Introduction" """
+    if text.startswith('#'):
+        return text.split('\n', 1)[1].strip() if '\n' in text else ''
+    return text
+
+
+def stitch_article(title, introduction, sections, conclusion):
+    """Join separately written parts into one article with a single References section
+
+    sections is [(heading, text)]. A section written without its heading gets it
+    added, and the URLs cited anywhere in the article are listed once at the end.
+    """
+    parts = [f"# {title}", without_heading(without_references(introduction))]
+    for heading, text in sections:
+        text = without_references(text)
+        parts.append(text if text.startswith('#') else f"### {heading}\n\n{text}")
+    parts.append(f"### Conclusion\n\n{without_heading(without_references(conclusion))}")
+
+    urls = extract_urls("\n\n".join(parts))
+    if urls:
+        parts.append("### References\n\n" + "\n".join(f"{i}. {url}" for i, url in enumerate(urls, start=1)))
+    return "\n\n".join(part for part in parts if part) + "\n"
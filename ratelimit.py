@@ -0,0 +1,210 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from cache import CACHE_DIR
+from metrics import record, stage
+
+# Provider rate limits in requests per minute, 0 = unlimited (override in .env)
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", 100))
+SEARCH_RATE_LIMIT = float(os.getenv("SEARCH_RATE_LIMIT", 300))
+# Requests that may be sent at once after an idle period
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 5))
+# "1" shares each provider's budget between every process using the same cache directory
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "0") == "1"
+
+# Retry settings for rate limited and failed provider calls (override in .env)
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 5))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 1.0))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 60.0))
+
+RETRY_STATUSES = frozenset([408, 409, 425, 429, 500, 502, 503, 504, 529])
+
+
+def error_status(error):
+    """HTTP status carried by an SDK or HTTP client exception, if any"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def error_chain(error):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_retryable(error):
+    """Whether error, or an error it was raised from, is a rate limit, server error or network failure"""
+    for e in error_chain(error):
+        status = error_status(e)
+        if status is not None:
+            return status in RETRY_STATUSES
+        name = type(e).__name__
+        if isinstance(e, (ConnectionError, TimeoutError)) or "Timeout" in name or "Connection" in name:
+            return True
+    return False
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the error's response, if any"""
+    for e in error_chain(error):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if headers:
+            try:
+                return float(headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class TokenBucket:
+    """Token bucket for one provider, shared by the threads of this process"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Tokens per second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token and return 0, or return the seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds):
+        """Hand out no tokens for seconds, after the provider said it is over quota"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class SharedTokenBucket:
+    """Token bucket kept in sqlite, shared by every process using the same file"""
+
+    def __init__(self, name, rate, capacity, cache_dir=None):
+        cache_dir = cache_dir or CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "ratelimit.sqlite3")
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            conn.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)", (name, capacity, time.time()))
+
+    def _connect(self):
+        # isolation_level=None so BEGIN IMMEDIATE below controls the transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _update(self, change):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            tokens, updated = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            tokens, result = change(tokens)
+            conn.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self.name))
+            conn.execute("COMMIT")
+            return result
+        finally:
+            conn.close()
+
+    def take(self):
+        def change(tokens):
+            if tokens >= 1:
+                return tokens - 1, 0.0
+            return tokens, (1 - tokens) / self.rate
+        return self._update(change)
+
+    def pause(self, seconds):
+        self._update(lambda tokens: (min(tokens, 0.0) - seconds * self.rate, None))
+
+
+class RateLimiter:
+    """Paces calls to one provider and retries them with jittered exponential backoff
+
+    Time spent waiting for a token is measured as the "throttled.<name>" stage and
+    time spent backing off after a failure as "backoff.<name>". A 429 pauses the
+    whole bucket, so its backoff is counted as throttled time.
+    """
+
+    def __init__(self, name, per_minute, burst=RATE_LIMIT_BURST, shared=RATE_LIMIT_SHARED,
+                 max_attempts=RETRY_MAX_ATTEMPTS):
+        self.name = name
+        self.max_attempts = max_attempts
+        if not per_minute:
+            self.bucket = None
+        elif shared:
+            self.bucket = SharedTokenBucket(name, per_minute / 60, burst)
+        else:
+            self.bucket = TokenBucket(per_minute / 60, burst)
+
+    def acquire(self):
+        if self.bucket is None:
+            return
+        while True:
+            wait = self.bucket.take()
+            if not wait:
+                return
+            with stage(f"throttled.{self.name}"):
+                time.sleep(wait)
+
+    def backoff_delay(self, attempt, error):
+        delay = retry_after(error)
+        if delay is None:
+            # Full jitter, so callers that failed together do not retry together
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        return min(delay, RETRY_MAX_DELAY)
+
+    def call(self, function, *args, **kwargs):
+        """Call function once a token is available, retrying retryable errors"""
+        for attempt in range(self.max_attempts):
+            self.acquire()
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                record(f"{self.name}_retries")
+                if error_status(e) == 429 and self.bucket is not None:
+                    # Over quota: hold back every caller, not only this one. The
+                    # wait happens in acquire, paced one token at a time
+                    self.bucket.pause(delay)
+                    continue
+                with stage(f"backoff.{self.name}"):
+                    time.sleep(delay)
+
+    def call_once(self, function, *args, **kwargs):
+        """Call function once a token is available, backing off after a retryable error before raising it"""
+        self.acquire()
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            if is_retryable(e):
+                delay = self.backoff_delay(0, e)
+                if error_status(e) == 429 and self.bucket is not None:
+                    self.bucket.pause(delay)
+                else:
+                    with stage(f"backoff.{self.name}"):
+                        time.sleep(delay)
+            raise
+
+
+llm_limiter = RateLimiter("llm", LLM_RATE_LIMIT)
+search_limiter = RateLimiter("search", SEARCH_RATE_LIMIT)
@@ -0,0 +1,167 @@
+import math
+import re
+
+URL_PATTERN = re.compile(r'https?://[^\s\)\]>"\'<]+')
+LIST_MARKER_PATTERN = re.compile(r'^\s*(?:[-*+]|\d+\.)\s+')
+MARKUP_PATTERN = re.compile(r'[#*_`>]+')
+# Citations rewritten to [n] markers by compaction: [Source: URL], [text](URL), bare URLs
+CITATION_PATTERN = re.compile(
+    r'\[Source:\s*(?P<source_url>https?://[^\s\]]+?)\s*\]'
+    r'|\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>https?://[^\s\)]+)\)'
+    r'|(?P<url>https?://[^\s\)\]>"\'<]+)'
+)
+MARKER_PATTERN = re.compile(r'\[\d+\]')
+WORD_PATTERN = re.compile(r'\w+')
+
+# Lines shorter than this (after removing markup) are structure such as
+# "Key findings:" and are kept even when they repeat across briefs
+MIN_DEDUPLICATED_LENGTH = 20
+
+# Share of words two findings must have in common to count as the same fact
+NEAR_DUPLICATE_SIMILARITY = 0.8
+
+# Rough size of a token in characters, close enough for budgeting English prose
+CHARS_PER_TOKEN = 4
+
+
+def normalize_line(line):
+    """Reduce a brief line to its wording, ignoring list markers, emphasis and case"""
+    line = MARKUP_PATTERN.sub('', LIST_MARKER_PATTERN.sub('', line))
+    return ' '.join(line.lower().split())
+
+
+def extract_urls(text):
+    """Return the URLs in text in order of first appearance, without trailing punctuation"""
+    urls = {}
+    for url in URL_PATTERN.findall(text):
+        urls.setdefault(url.rstrip('.,;:'), None)
+    return list(urls)
+
+
+def merge_research_briefs(briefs):
+    """Merge {section title: brief} into one brief, dropping repeated findings and citations
+
+    A finding that an earlier section already reported verbatim is left out, and
+    every cited URL is listed once in a closing Sources section.
+    """
+    seen = set()
+    sections = []
+    for title, brief in briefs.items():
+        lines = []
+        for line in brief.splitlines():
+            if line.lstrip().startswith('#'):
+                # Nest the brief's own headings under its section
+                lines.append('##' + line.strip())
+                continue
+            key = normalize_line(line)
+            if len(key) >= MIN_DEDUPLICATED_LENGTH:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line.rstrip())
+        sections.append(f"## {title}\n\n" + "\n".join(lines).strip())
+
+    sources = extract_urls("\n".join(briefs.values()))
+    if sources:
+        sections.append("## Sources\n\n" + "\n".join(f"- {url}" for url in sources))
+    return "\n\n".join(sections) + "\n"
+
+
+def estimate_tokens(text):
+    """Approximate LLM token count of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def compact_research_brief(brief, token_budget=None):
+    """Shrink a research brief for the writer's prompt, keeping every cited source
+
+    Citations are replaced by [n] markers into a closing Sources table, so a URL
+    cited many times is spelled out once. Findings that repeat an earlier one
+    (same numbers, nearly the same words) are dropped, and their markers move to
+    the finding that is kept. If token_budget is set, findings are then dropped
+    from the end of the longest sections until the brief fits. Headings and the
+    Sources table are always kept, so no URL is ever lost.
+    """
+    sources = {}  # URL -> marker number
+
+    def cite(url):
+        url = url.rstrip('.,;:')
+        return f"[{sources.setdefault(url, len(sources) + 1)}]"
+
+    def replace_citation(match):
+        if match.group('source_url'):
+            return cite(match.group('source_url'))
+        if match.group('link_url'):
+            return f"{match.group('link_text')} {cite(match.group('link_url'))}"
+        url = match.group('url')
+        stripped = url.rstrip('.,;:')
+        return cite(stripped) + url[len(stripped):]
+
+    sections = [[None, []]]  # [heading, body lines]
+    findings = []  # (word set, number set, section body, line index)
+    for line in brief.splitlines():
+        line = CITATION_PATTERN.sub(replace_citation, line.rstrip())
+        if line.lstrip().startswith('#'):
+            sections.append([line.strip(), []])
+            continue
+        body = sections[-1][1]
+        text = normalize_line(MARKER_PATTERN.sub('', line))
+        if not line:
+            if body and body[-1]:
+                body.append(line)
+            continue
+        if not text or text.rstrip(':') in ('source', 'sources'):
+            # A bare list of sources or its label, replaced by the Sources table
+            continue
+
+        words = set(WORD_PATTERN.findall(text))
+        numbers = {word for word in words if any(c.isdigit() for c in word)}
+        duplicate = None
+        if len(text) >= MIN_DEDUPLICATED_LENGTH:
+            for finding in findings:
+                if finding[1] == numbers and len(words & finding[0]) >= NEAR_DUPLICATE_SIMILARITY * len(words | finding[0]):
+                    duplicate = finding
+                    break
+        if duplicate is None:
+            if len(text) >= MIN_DEDUPLICATED_LENGTH:
+                findings.append((words, numbers, body, len(body)))
+            body.append(line)
+            continue
+        # Keep the first wording and attach the sources of the repeat to it
+        kept_body, index = duplicate[2], duplicate[3]
+        for marker in MARKER_PATTERN.findall(line):
+            if marker not in kept_body[index]:
+                kept_body[index] += ' ' + marker
+
+    def render():
+        parts = []
+        next_level = 0  # Heading level of the next section that is kept
+        for heading, body in reversed(sections):
+            text = "\n".join(body).strip()
+            level = len(heading) - len(heading.lstrip('#')) if heading else 0
+            if heading and (text or 0 < level < next_level):
+                # Empty headings are kept only as parents of the sections below them
+                parts.append(f"{heading}\n\n{text}" if text else heading)
+                next_level = level
+            elif text:
+                parts.append(text)
+        parts.reverse()
+        if sources:
+            parts.append("## Sources\n\n" + "\n".join(f"[{n}] {url}" for url, n in sources.items()))
+        return "\n\n".join(parts) + "\n"
+
+    compacted = render()
+    if len(compacted) >= len(brief) and (not token_budget or estimate_tokens(brief) <= token_budget):
+        # Nothing repeated, so markers and the table would only add to it
+        return brief
+    if token_budget:
+        # Trim in rounds so every section keeps its first findings
+        while estimate_tokens(compacted) > token_budget:
+            body = max((body for _, body in sections), key=lambda body: sum(1 for line in body if line))
+            while body and not body[-1]:
+                body.pop()
+            if not body:
+                break
+            body.pop()
+            compacted = render()
+    return compacted
@@ -0,0 +1,223 @@
+import contextlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from cache import CACHE_DIR
+
+# Research store settings (override in .env)
+# Cosine similarity of topic TF-IDF vectors needed to reuse a brief, 0 = never reuse
+RESEARCH_REUSE_THRESHOLD = float(os.getenv("RESEARCH_REUSE_THRESHOLD", 0.8))
+# Share of the stored topic's TF-IDF weight the new topic's terms must carry, so
+# a broader topic ("healthcare") does not reuse a narrower brief ("AI in healthcare")
+RESEARCH_REUSE_COVERAGE = float(os.getenv("RESEARCH_REUSE_COVERAGE", 0.9))
+# Briefs younger than this are reused as they are (seconds)
+RESEARCH_FRESHNESS = int(os.getenv("RESEARCH_FRESHNESS", 3 * 24 * 60 * 60))
+# Older briefs are refreshed with a news-only research run instead, until the
+# full research is this old and is done again
+RESEARCH_MAX_AGE = int(os.getenv("RESEARCH_MAX_AGE", 30 * 24 * 60 * 60))
+RESEARCH_STORE_MAX_ENTRIES = int(os.getenv("RESEARCH_STORE_MAX_ENTRIES", 2000))
+
+TERM_PATTERN = re.compile(r'[a-z0-9]+')
+YEAR_PATTERN = re.compile(r'^(19|20)\d\d$')
+
+# Words that phrase a topic without changing what has to be researched
+TOPIC_STOPWORDS = frozenset(
+    "a an and are about for from how in into is of on the to what why with "
+    "latest new news recent today trend trends update updates future outlook overview guide".split()
+)
+
+
+def topic_years(topic):
+    """Years a topic is scoped to, compared separately from its terms"""
+    return frozenset(word for word in TERM_PATTERN.findall(topic.lower()) if YEAR_PATTERN.match(word))
+
+
+def years_compatible(years, stored_years, created, now=None):
+    """Whether research on a topic scoped to stored_years, done at created, fits a topic scoped to years
+
+    A stored topic without a year is taken to be about the year it was researched
+    in, and a new topic without a year about the year it is asked in.
+    """
+    if not years and not stored_years:
+        return True
+    if not stored_years:
+        stored_years = {str(time.localtime(created).tm_year)}
+    if not years:
+        years = {str(time.localtime(time.time() if now is None else now).tm_year)}
+    return years == stored_years
+
+
+def topic_terms(topic):
+    """Term counts of a topic, without filler words, years and plural endings"""
+    terms = Counter()
+    for word in TERM_PATTERN.findall(topic.lower()):
+        if word in TOPIC_STOPWORDS or YEAR_PATTERN.match(word):
+            continue
+        if len(word) > 4 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms[word] += 1
+    return terms
+
+
+class ResearchMatch:
+    """A stored research brief found for a new topic
+
+    brief is the full research, and news the latest news-only refresh of it, if any.
+    """
+
+    def __init__(self, row_id, topic, brief, similarity, created, news=None, refreshed=None):
+        self.row_id = row_id
+        self.topic = topic
+        self.brief = brief
+        self.similarity = similarity
+        self.created = created
+        self.news = news
+        self.refreshed = refreshed
+
+    @property
+    def age(self):
+        """Seconds since the brief was last researched or refreshed"""
+        return time.time() - (self.refreshed or self.created)
+
+
+class ResearchStore:
+    """Past research briefs, found again by the TF-IDF similarity of their topics
+
+    Briefs live in sqlite next to the other caches, so every process shares them.
+    Topic terms are indexed in memory and the index picks up rows written by other
+    processes on each lookup. A brief is only reused for a topic scoped to the
+    same years whose terms cover the stored topic's distinctive terms. A refresh
+    replaces the news kept with a brief and does not change its created time, so
+    the brief still expires max_age after its full research.
+    """
+
+    def __init__(self, name="research", max_entries=RESEARCH_STORE_MAX_ENTRIES, max_age=RESEARCH_MAX_AGE,
+                 cache_dir=None):
+        cache_dir = cache_dir or CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}.sqlite3")
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._index = {}  # row id -> (topic, model, created, term counts, years)
+        self._document_frequency = Counter()
+        self._last_id = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS briefs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT, model TEXT, created REAL, brief TEXT, "
+                "news TEXT, refreshed REAL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(briefs)")}
+            # Stores written before refreshes were kept apart from their brief
+            for column, column_type in (("news", "TEXT"), ("refreshed", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE briefs ADD COLUMN {column} {column_type}")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection for one block, committed (or rolled back on error) and closed when it ends"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _sync(self, conn):
+        """Index rows added since the last sync, by this or another process"""
+        rows = conn.execute(
+            "SELECT id, topic, model, created FROM briefs WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        for row_id, topic, model, created in rows:
+            terms = topic_terms(topic)
+            self._index[row_id] = (topic, model, created, terms, topic_years(topic))
+            self._document_frequency.update(terms.keys())
+            self._last_id = row_id
+
+    def _forget(self, row_ids):
+        for row_id in row_ids:
+            entry = self._index.pop(row_id, None)
+            if entry is not None:
+                self._document_frequency.subtract(entry[3].keys())
+
+    def _vector(self, terms):
+        documents = len(self._index) + 1
+        vector = {
+            term: count * (math.log(documents / (self._document_frequency[term] + 1)) + 1)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def find(self, topic, model, threshold=RESEARCH_REUSE_THRESHOLD, coverage=RESEARCH_REUSE_COVERAGE):
+        """Return the most similar brief fully researched with model within max_age, or None"""
+        terms = topic_terms(topic)
+        if not terms or not threshold:
+            return None
+        years = topic_years(topic)
+        now = time.time()
+        oldest = now - self.max_age
+        with self._lock, self._connect() as conn:
+            self._sync(conn)
+            query = self._vector(terms)
+            candidates = []
+            for row_id, (stored_topic, stored_model, created, stored_terms, stored_years) in self._index.items():
+                if stored_model != model or created < oldest or not terms.keys() & stored_terms.keys():
+                    continue
+                if not years_compatible(years, stored_years, created, now):
+                    continue
+                vector = self._vector(stored_terms)
+                similarity = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+                # The vector is normalized, so squared weights are shares of the stored topic
+                covered = sum(weight * weight for term, weight in vector.items() if term in terms)
+                if similarity >= threshold and covered >= coverage:
+                    # Most similar first, then the most recent
+                    candidates.append((similarity, created, row_id))
+
+            for similarity, created, row_id in sorted(candidates, reverse=True):
+                row = conn.execute("SELECT brief, news, refreshed FROM briefs WHERE id = ?", (row_id,)).fetchone()
+                if row is None:
+                    # Evicted by another process
+                    self._forget([row_id])
+                    continue
+                return ResearchMatch(row_id, self._index[row_id][0], row[0], similarity, created, row[1], row[2])
+        return None
+
+    def add(self, topic, model, brief):
+        """Store a brief and evict briefs past max_age or over max_entries, oldest first"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO briefs (topic, model, created, brief) VALUES (?, ?, ?, ?)", (topic, model, now, brief)
+            )
+            expired = [row[0] for row in conn.execute("SELECT id FROM briefs WHERE created < ?", (now - self.max_age,))]
+            count = conn.execute("SELECT COUNT(*) FROM briefs").fetchone()[0] - len(expired)
+            if count > self.max_entries:
+                expired += [row[0] for row in conn.execute(
+                    "SELECT id FROM briefs WHERE created >= ? ORDER BY created ASC LIMIT ?",
+                    (now - self.max_age, count - self.max_entries),
+                )]
+            conn.executemany("DELETE FROM briefs WHERE id = ?", [(row_id,) for row_id in expired])
+            self._sync(conn)
+            self._forget(expired)
+
+    def refresh(self, row_id, news):
+        """Keep news as the latest refresh of a stored brief, replacing the previous one"""
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE briefs SET news = ?, refreshed = ? WHERE id = ?", (news, time.time(), row_id))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM briefs").fetchone()[0]
+
+
+research_store = ResearchStore()
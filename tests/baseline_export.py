@@ -0,0 +1,62 @@
+"""Inline formatting of the Word export before the single-pass rewrite, kept to compare against"""
+import re
+
+
+def add_simple_formatted_text(paragraph, text):
+    text = re.sub(r'Link\s+\(([^)]+)\)', r'\1', text)
+
+    current_pos = 0
+    processed_any_links = False
+    for match in re.finditer(r'\[([^\]]+)\]\(([^)]+)\)', text):
+        processed_any_links = True
+        if match.start() > current_pos:
+            add_text_formatting(paragraph, text[current_pos:match.start()])
+        add_hyperlink(paragraph, match.group(2), match.group(1))
+        current_pos = match.end()
+
+    if not processed_any_links:
+        url_current_pos = 0
+        for url_match in re.finditer(r'(?<!Source:\s)(https?://[^\s\)\],]+)', text):
+            if "Source:" in text[max(0, url_match.start() - 15):url_match.start()]:
+                continue
+            if url_match.start() > url_current_pos:
+                add_text_formatting(paragraph, text[url_current_pos:url_match.start()])
+            add_hyperlink(paragraph, url_match.group(0), url_match.group(0))
+            url_current_pos = url_match.end()
+        if url_current_pos < len(text):
+            add_text_formatting(paragraph, text[url_current_pos:])
+        elif url_current_pos == 0:
+            add_text_formatting(paragraph, text)
+    elif current_pos < len(text):
+        add_text_formatting(paragraph, text[current_pos:])
+
+
+def add_hyperlink(paragraph, url, text):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    r_id = paragraph.part.relate_to(
+        url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True
+    )
+    hyperlink = OxmlElement("w:hyperlink", {qn("r:id"): r_id})
+    run = OxmlElement("w:r")
+    text_element = OxmlElement("w:t")
+    text_element.text = text
+    run.append(text_element)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def add_text_formatting(paragraph, text):
+    if not text.strip():
+        return
+    for i, part in enumerate(re.split(r'\*\*(.*?)\*\*', text)):
+        if i % 2:
+            if part:
+                paragraph.add_run(part).bold = True
+            continue
+        for j, italic_part in enumerate(re.split(r'(?<!\*)\*([^*]+)\*(?!\*)', part)):
+            if italic_part:
+                run = paragraph.add_run(italic_part)
+                if j % 2:
+                    run.italic = True
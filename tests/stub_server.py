@@ -0,0 +1,56 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local HTTP server answering from routes {path: (status, headers, body)}
+
+    A route can also be a function of the request handler returning that tuple.
+    Every request is counted in `requests` as (method, path). Use it as a context
+    manager, `url(path)` gives the address of a route.
+    """
+
+    daemon_threads = True
+    # The default backlog of 5 makes concurrent clients wait on SYN retries
+    request_queue_size = 512
+
+    def __init__(self, routes, host="127.0.0.1", delay=0.0):
+        super().__init__((host, 0), StubHandler)
+        self.routes = routes
+        self.delay = delay
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}{path}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def respond(self):
+        with self.server._lock:
+            self.server.requests.append((self.command, self.path))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        route = self.server.routes.get(self.path, (404, {}, b"not found"))
+        status, headers, body = route(self) if callable(route) else route
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_HEAD = respond
+
+    def log_message(self, format, *args):
+        pass
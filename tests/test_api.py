@@ -0,0 +1,36 @@
+import unittest
+
+from starlette.testclient import TestClient
+
+import api
+from api import BadRequest, generation_params
+from generator import DEFAULT_MODEL
+
+
+class GenerationParamsTest(unittest.TestCase):
+    def test_defaults(self):
+        params = generation_params({"topic": "  Edge computing  "})
+        self.assertEqual(params["topic"], "Edge computing")
+        self.assertEqual(params["model"], DEFAULT_MODEL)
+        self.assertIs(params["force"], False)
+
+    def test_rejects_invalid_fields(self):
+        for body in [{}, {"topic": " "}, {"topic": "x", "model": "gpt-4o"}, {"topic": "x", "model": ["cohere"]},
+                     {"topic": "x", "temperature": "hot"}, {"topic": "x", "temperature": 1.5},
+                     {"topic": "x", "research_mode": "deep"}, {"topic": "x", "force": "false"},
+                     {"topic": "x", "force": 1}]:
+            with self.subTest(body=body), self.assertRaises(BadRequest):
+                generation_params(body)
+
+
+class GenerateEndpointTest(unittest.TestCase):
+    def test_rejects_non_boolean_stream(self):
+        with TestClient(api.app) as client:
+            response = client.post("/generate", json={"topic": "Edge computing", "stream": "false"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "'stream' must be true or false"})
+        self.assertEqual(api.admission.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
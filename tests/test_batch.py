@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from batch import load_topics
+
+
+class LoadTopicsTest(unittest.TestCase):
+    def load(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return load_topics(f.name)
+
+    def test_ids(self):
+        items = self.load('{"id": "ai-health", "topic": "AI in healthcare"}\n\n{"title": "Edge computing"}\n')
+        self.assertEqual(items, [{"id": "ai-health", "topic": "AI in healthcare"}, {"id": "3", "topic": "Edge computing"}])
+
+    def test_rejects_repeated_ids(self):
+        with self.assertRaisesRegex(ValueError, "already used on line 1"):
+            self.load('{"id": "a", "topic": "x"}\n{"id": "a", "topic": "y"}\n')
+
+    def test_rejects_ids_unsafe_in_paths(self):
+        for item_id in ["../escaped", "a/b", "a b"]:
+            with self.subTest(item_id=item_id), self.assertRaisesRegex(ValueError, "may only use"):
+                self.load(f'{{"request_id": "{item_id}", "topic": "x"}}\n')
+
+    def test_rejects_missing_topic(self):
+        with self.assertRaisesRegex(ValueError, "missing 'topic'"):
+            self.load('{"id": "a"}\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
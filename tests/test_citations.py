@@ -0,0 +1,145 @@
+import socket
+import tempfile
+import time
+import unittest
+
+from cache import DiskCache
+from citations import LinkChecker, extract_links, mark_dead_links, verify_citations
+from stub_server import StubServer
+
+ARTICLE = """# AI in Healthcare
+
+Adoption rose 40% [Source: https://dead.com/a]. Costs fell, see [the report](https://ok.com/b).
+Staffing data from https://dead.com/c.
+
+### References
+
+1. https://dead.com/a
+2. https://ok.com/b
+"""
+
+
+class FakeChecker:
+    def __init__(self, results):
+        self.results = results
+
+    def check_many(self, urls):
+        return {url: self.results[url] for url in urls}
+
+
+def result(url, state, status):
+    return {"url": url, "state": state, "status": status, "error": None, "checked": time.time()}
+
+
+class MarkDeadLinksTest(unittest.TestCase):
+    def test_extract_links(self):
+        self.assertEqual(extract_links(ARTICLE), ["https://dead.com/a", "https://ok.com/b", "https://dead.com/c"])
+
+    def test_extract_links_inside_emphasis(self):
+        self.assertEqual(extract_links("**[Report](https://a.com/x)** and **Source: https://b.com/y**"),
+                         ["https://a.com/x", "https://b.com/y"])
+
+    def test_annotate_links_inside_emphasis(self):
+        text = "1. **[Report](https://a.com/x)**\n2. *see https://b.com/y*, and **https://ok.com/b**\n"
+        self.assertEqual(mark_dead_links(text, {"https://a.com/x", "https://b.com/y"}),
+                         "1. **[Report](https://a.com/x)** *(link unavailable)*\n"
+                         "2. *see https://b.com/y* *(link unavailable)*, and **https://ok.com/b**\n")
+
+    def test_strip_links_inside_emphasis(self):
+        text = "Costs fell (**Source: https://a.com/x**). See *[the study](https://b.com/y)*. Source: https://c.com/z.\n"
+        self.assertEqual(mark_dead_links(text, {"https://a.com/x", "https://b.com/y", "https://c.com/z"}, strip=True),
+                         "Costs fell. See *the study*.\n")
+
+    def test_annotate(self):
+        marked = mark_dead_links(ARTICLE, {"https://dead.com/a", "https://dead.com/c"})
+        self.assertIn("[Source: https://dead.com/a] *(link unavailable)*.", marked)
+        self.assertIn("from https://dead.com/c *(link unavailable)*.", marked)
+        self.assertIn("1. https://dead.com/a *(link unavailable)*", marked)
+        self.assertIn("[the report](https://ok.com/b)", marked)
+
+    def test_strip(self):
+        marked = mark_dead_links(ARTICLE, {"https://dead.com/a", "https://dead.com/c", "https://ok.com/b"}, strip=True)
+        self.assertEqual(marked, "# AI in Healthcare\n\nAdoption rose 40%. Costs fell, see the report.\n"
+                                 "Staffing data from.\n")
+
+    def test_strip_keeps_references_with_live_entries(self):
+        marked = mark_dead_links(ARTICLE, {"https://dead.com/a"}, strip=True)
+        self.assertTrue(marked.endswith("### References\n\n2. https://ok.com/b\n"))
+
+    def test_verify_leaves_article_when_no_server_answers(self):
+        checker = FakeChecker({url: result(url, "unverified", None) for url in extract_links(ARTICLE)})
+        self.assertEqual(verify_citations(ARTICLE, "strip", checker), ARTICLE)
+
+    def test_verify_marks_only_dead_links(self):
+        checker = FakeChecker({
+            "https://dead.com/a": result("https://dead.com/a", "dead", 404),
+            "https://ok.com/b": result("https://ok.com/b", "ok", 200),
+            "https://dead.com/c": result("https://dead.com/c", "unverified", 403),
+        })
+        marked = verify_citations(ARTICLE, "annotate", checker)
+        self.assertEqual(marked.count("*(link unavailable)*"), 2)
+        self.assertNotIn("dead.com/c *(link", marked)
+
+
+class LinkCheckerTest(unittest.TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache = DiskCache("links", cache_dir=cache_dir.name)
+
+    def checker(self, **kwargs):
+        return LinkChecker(cache=self.cache, **kwargs)
+
+    def test_states(self):
+        def head_refused(handler):
+            return (405, {}, b"") if handler.command == "HEAD" else (200, {}, b"ok")
+
+        routes = {"/ok": (200, {}, b"ok"), "/gone": (410, {}, b""), "/head-refused": head_refused,
+                  "/forbidden": (403, {}, b""), "/error": (503, {}, b"")}
+        with StubServer(routes) as server:
+            results = self.checker(allow_private=True).check_many([server.url(path) for path in routes] +
+                                                                 [server.url("/missing")])
+        states = {url.rsplit("/", 1)[1]: result["state"] for url, result in results.items()}
+        self.assertEqual(states, {"ok": "ok", "gone": "dead", "head-refused": "ok", "forbidden": "unverified",
+                                  "error": "unverified", "missing": "dead"})
+        self.assertIn(("GET", "/head-refused"), server.requests)
+        self.assertNotIn(("GET", "/ok"), server.requests)
+
+    def test_caches_verified_results(self):
+        with StubServer({"/ok": (200, {}, b"ok"), "/forbidden": (403, {}, b"")}) as server:
+            checker = self.checker(allow_private=True)
+            urls = [server.url("/ok"), server.url("/forbidden")]
+            checker.check_many(urls)
+            checker.check_many(urls)
+        self.assertEqual(server.requests.count(("HEAD", "/ok")), 1)
+        self.assertEqual(server.requests.count(("HEAD", "/forbidden")), 2)
+
+    def test_connection_failure_is_unverified(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+        result = self.checker(allow_private=True).check_many([url])[url]
+        self.assertEqual((result["state"], result["status"]), ("unverified", None))
+        self.assertIsNone(self.cache.get(url))
+
+    def test_blocks_private_addresses(self):
+        with StubServer({"/ok": (200, {}, b"ok")}) as server:
+            result = self.checker().check_many([server.url("/ok")])[server.url("/ok")]
+        self.assertEqual(result["state"], "unverified")
+        self.assertIn("not on a public address", result["error"])
+        self.assertEqual(server.requests, [])
+
+    def test_checks_links_concurrently(self):
+        routes = {f"/{n}": (200, {}, b"ok") for n in range(50)}
+        with StubServer(routes, delay=0.3) as server:
+            checker = self.checker(allow_private=True, per_host=50)
+            start = time.perf_counter()
+            results = checker.check_many([server.url(path) for path in routes])
+            elapsed = time.perf_counter() - start
+        self.assertTrue(all(result["state"] == "ok" for result in results.values()))
+        # One at a time, the 50 checks would take 15 seconds
+        self.assertLess(elapsed, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
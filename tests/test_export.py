@@ -0,0 +1,69 @@
+import io
+import unittest
+
+from baseline_export import add_simple_formatted_text
+from export import HyperlinkWriter, add_formatted_text, inline_html, markdown_to_html
+
+# Lines as they come out of the writer, each rendered as one paragraph
+LINES = [
+    "Plain text without any formatting.",
+    "AI adoption rose **40%** in 2024, *according to* the survey.",
+    "See [the report](https://a.com/x) for details.",
+    "Full data at https://b.com/y, updated monthly.",
+    "Adoption rose 40% [Source: https://a.com/x].",
+    "**Report**: [Hospital AI survey](https://a.com/x)",
+    "**[Hospital AI survey](https://a.com/x)**",
+    "*[Staffing study](https://b.com/y)*",
+    "**Source: https://a.com/x**",
+    "**Costs:** see https://c.com/costs",
+]
+
+
+def render(add, text):
+    from docx import Document
+
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    add(paragraph, text)
+    return paragraph
+
+
+def summary(paragraph):
+    """Paragraph text without emphasis markers, and its (link text, URL) pairs"""
+    links = [(hyperlink.text, hyperlink.url) for hyperlink in paragraph.hyperlinks]
+    return paragraph.text.replace("*", ""), links
+
+
+class InlineFormattingTest(unittest.TestCase):
+    def test_matches_baseline_converter(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                paragraph = render(lambda p, text: add_formatted_text(p, text, HyperlinkWriter(p.part.document)), line)
+                self.assertEqual(summary(paragraph), summary(render(add_simple_formatted_text, line)))
+
+    def test_links_inside_emphasis(self):
+        from docx import Document
+
+        doc = Document()
+        paragraph = doc.add_paragraph()
+        add_formatted_text(paragraph, "**[Report](https://a.com/x)** and *[study](https://b.com/y)*", HyperlinkWriter(doc))
+        bold, italic = paragraph.hyperlinks
+        self.assertEqual((bold.url, bold.text, bold.runs[0].bold), ("https://a.com/x", "Report", True))
+        self.assertEqual((italic.url, italic.text, italic.runs[0].italic), ("https://b.com/y", "study", True))
+        self.assertEqual(paragraph.text, "Report and study")
+
+    def test_html(self):
+        self.assertEqual(
+            inline_html("**[Report](https://a.com/x)** & *see https://b.com/y*"),
+            '<strong><a href="https://a.com/x">Report</a></strong> &amp; '
+            '<em>see </em><em><a href="https://b.com/y">https://b.com/y</a></em>',
+        )
+        self.assertEqual(inline_html("**Source: https://a.com/x**"), "<strong>Source: https://a.com/x</strong>")
+
+    def test_html_page(self):
+        page = markdown_to_html("# Title\n\n1. **[Report](https://a.com/x)**\n").decode()
+        self.assertIn('<ol>\n<li><strong><a href="https://a.com/x">Report</a></strong></li>\n</ol>', page)
+
+
+if __name__ == "__main__":
+    unittest.main()
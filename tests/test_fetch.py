@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import fetch
+from cache import DiskCache
+from fetch import PageFetcher, TextExtractor
+from stub_server import StubServer
+
+PAGE = b"""<html><head><title>AI in
+healthcare</title><script>var tracking = 1;</script></head>
+<body><nav>Home | About</nav>
+<article><h1>Hospitals adopt AI</h1><p>Adoption rose 40% in 2024.</p></article>
+<footer>Copyright</footer></body></html>"""
+HTML = {"Content-Type": "text/html; charset=utf-8"}
+
+
+class TextExtractorTest(unittest.TestCase):
+    def test_prefers_main_content(self):
+        extractor = TextExtractor()
+        extractor.feed(PAGE.decode())
+        self.assertEqual(" ".join(extractor.title.split()), "AI in healthcare")
+        self.assertEqual(extractor.text(), "Hospitals adopt AI\nAdoption rose 40% in 2024.")
+
+    def test_limits_text(self):
+        extractor = TextExtractor(max_chars=10)
+        extractor.feed("<p>" + "word " * 100 + "</p><p>more</p>")
+        self.assertTrue(extractor.full)
+        self.assertEqual(len(extractor.text()), 10)
+
+
+class PageFetcherTest(unittest.TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache = DiskCache("pages", cache_dir=cache_dir.name)
+
+    def fetcher(self, **kwargs):
+        return PageFetcher(cache=self.cache, **kwargs)
+
+    def test_extracts_page_text(self):
+        with StubServer({"/page": (200, HTML, PAGE)}) as server:
+            page = self.fetcher(allow_private=True).fetch(server.url("/page"))
+        self.assertEqual(page["title"], "AI in healthcare")
+        self.assertEqual(page["text"], "Hospitals adopt AI\nAdoption rose 40% in 2024.")
+
+    def test_revalidates_with_etag(self):
+        def page(handler):
+            if handler.headers.get("If-None-Match") == '"v1"':
+                return 304, {}, b""
+            return 200, {**HTML, "ETag": '"v1"'}, PAGE
+
+        with StubServer({"/page": page}) as server:
+            fetcher = self.fetcher(allow_private=True)
+            first = fetcher.fetch(server.url("/page"))
+            with mock.patch.object(fetch, "PAGE_CACHE_FRESHNESS", 0):
+                second = fetcher.fetch(server.url("/page"))
+        self.assertEqual(first, second)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_rejects_binary_content(self):
+        with StubServer({"/file.pdf": (200, {"Content-Type": "application/pdf"}, b"%PDF")}) as server:
+            page = self.fetcher(allow_private=True).fetch(server.url("/file.pdf"))
+        self.assertIn("unsupported content type", page["error"])
+
+    def test_blocks_private_addresses(self):
+        with StubServer({"/page": (200, HTML, PAGE)}) as server:
+            page = self.fetcher().fetch(server.url("/page"))
+        self.assertIn("not on a public address", page["error"])
+        self.assertEqual(server.requests, [])
+
+    def test_blocks_redirects_to_private_addresses(self):
+        with StubServer({"/page": (200, HTML, PAGE)}, host="127.0.0.2") as target:
+            redirect = (302, {"Location": target.url("/page")}, b"")
+            with StubServer({"/redirect": redirect}) as server, \
+                    mock.patch.object(fetch, "is_public_address", lambda address: address == "127.0.0.1"):
+                page = self.fetcher().fetch(server.url("/redirect"))
+        self.assertIn("127.0.0.2", page["error"])
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(target.requests, [])
+
+    def test_fetch_many_keeps_order(self):
+        routes = {f"/{n}": (200, HTML, f"<p>page {n}</p>".encode()) for n in range(5)}
+        with StubServer(routes) as server:
+            urls = [server.url(f"/{n}") for n in (3, 1, 3, 0)]
+            pages = self.fetcher(allow_private=True).fetch_many(urls)
+        self.assertEqual([page["text"] for page in pages], ["page 3", "page 1", "page 3", "page 0"])
+        self.assertEqual(len(server.requests), 3)
+
+
+class EnsurePublicURLTest(unittest.TestCase):
+    def test_addresses(self):
+        for url in ["http://127.0.0.1/", "http://[::1]/", "http://10.0.0.1/", "http://169.254.169.254/latest",
+                    "http://[::ffff:192.168.0.1]/", "http://localhost:8080/"]:
+            with self.subTest(url=url), self.assertRaises(fetch.BlockedURLError):
+                fetch.ensure_public_url(url)
+        fetch.ensure_public_url("http://93.184.216.34/")
+
+    def test_rejects_other_schemes(self):
+        with self.assertRaises(fetch.BlockedURLError):
+            fetch.ensure_public_url("file:///etc/passwd")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import ratelimit
+from cache import DiskCache
+from generator import ResultCache, rate_limited_llm_class
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache = ResultCache(DiskCache("results", cache_dir=cache_dir.name), memory_size=4)
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def compute(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return f"article {self.calls}"
+
+    def test_coalesces_concurrent_misses(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(self.cache.get_or_compute, "key", self.compute)
+            self.assertTrue(self.started.wait(5))
+            second = executor.submit(self.cache.get_or_compute, "key", self.compute)
+            time.sleep(0.2)  # Let the second caller find the run in flight
+            self.release.set()
+            self.assertEqual(first.result(5), ("article 1", False))
+            self.assertEqual(second.result(5), ("article 1", True))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache._inflight, {})
+
+    def test_rechecks_after_taking_the_run(self):
+        self.release.set()
+        self.cache.get_or_compute("key", self.compute)
+        # The previous run finished after this caller's first lookup missed
+        lookup = self.cache._get
+        lookups = iter([None])
+        self.cache._get = lambda key: next(lookups, None) or lookup(key)
+        self.assertEqual(self.cache.get_or_compute("key", self.compute), ("article 1", True))
+        self.assertEqual(self.calls, 1)
+
+    def test_force_recomputes(self):
+        self.release.set()
+        self.cache.get_or_compute("key", self.compute)
+        self.assertEqual(self.cache.get_or_compute("key", self.compute, force=True), ("article 2", False))
+        self.assertEqual(self.cache.get_or_compute("key", self.compute), ("article 2", True))
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_run_is_not_cached(self):
+        def fail():
+            raise RuntimeError("crew failed")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_compute("key", fail)
+        self.release.set()
+        self.assertEqual(self.cache.get_or_compute("key", self.compute), ("article 1", False))
+
+
+class FakeLLM:
+    """Streams two chunks to chunks, failing with a dropped connection the first time"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chunks = []
+        self.calls = 0
+
+    def call(self, prompt):
+        self.calls += 1
+        self.chunks.append("Hello ")
+        if self.calls == 1:
+            raise ConnectionError("connection reset mid-stream")
+        self.chunks.append("world")
+        return "Hello world"
+
+
+class RateLimitedLLMTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(ratelimit, "RETRY_BASE_DELAY", 0.001)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_retries_calls(self):
+        llm = FakeLLM(stream=False)
+        llm.__class__ = rate_limited_llm_class(FakeLLM)
+        self.assertEqual(llm.call("prompt"), "Hello world")
+        self.assertEqual(llm.calls, 2)
+
+    def test_leaves_streamed_calls_to_task_retries(self):
+        llm = FakeLLM(stream=True)
+        llm.__class__ = rate_limited_llm_class(FakeLLM)
+        with self.assertRaises(ConnectionError):
+            llm.call("prompt")
+        self.assertEqual((llm.calls, llm.chunks), (1, ["Hello "]))
+
+
+if __name__ == "__main__":
+    unittest.main()
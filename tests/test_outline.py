@@ -0,0 +1,103 @@
+import unittest
+
+from outline import parse_outline, research_slice, stitch_article
+
+OUTLINE = """```markdown
+# AI in Healthcare
+## Introduction
+- Why hospitals care
+## 1. Costs
+#### Hardware
+- GPU prices fell [1]
+#### Energy
+### **Adoption**
+- Adoption rose 40% in 2024 [2]
+## Conclusion
+## References
+```"""
+
+BRIEF = """## News
+
+- GPU prices for hospital servers fell sharply in 2024 [1]
+- Hospital adoption of diagnostic AI rose 40% in 2024 [2]
+
+## Trends
+
+- Staffing shortages push hospitals toward automated triage tools
+
+## Sources
+
+[1] https://a.com/gpu
+[2] https://b.com/adoption
+"""
+
+
+class ParseOutlineTest(unittest.TestCase):
+    def test_sections(self):
+        title, sections = parse_outline(OUTLINE)
+        self.assertEqual(title, "AI in Healthcare")
+        self.assertEqual(sections, [
+            ("Costs", "- Hardware\n- GPU prices fell [1]\n- Energy"),
+            ("Adoption", "- Adoption rose 40% in 2024 [2]"),
+        ])
+
+    def test_deeper_headings_before_any_section(self):
+        title, sections = parse_outline("# Title\n#### Note\n## Body\n- point")
+        self.assertEqual(sections, [("Body", "- point")])
+
+    def test_without_sections(self):
+        self.assertEqual(parse_outline("Just some text"), (None, []))
+
+
+class ResearchSliceTest(unittest.TestCase):
+    def test_by_markers(self):
+        sliced = research_slice(BRIEF, "Costs\n- GPU prices fell [1]")
+        self.assertEqual(sliced, "## News\n\n- GPU prices for hospital servers fell sharply in 2024 [1]\n\n"
+                                 "## Sources\n\n[1] https://a.com/gpu\n")
+
+    def test_by_shared_words(self):
+        sliced = research_slice(BRIEF, "Staffing\n- Shortages of hospital staffing and triage")
+        self.assertIn("- Staffing shortages push hospitals toward automated triage tools", sliced)
+        self.assertNotIn("GPU", sliced)
+        self.assertNotIn("## Sources", sliced)
+
+    def test_whole_brief_without_relevant_findings(self):
+        self.assertEqual(research_slice(BRIEF, "Regulation\n- Rules in Europe"), BRIEF)
+
+
+class StitchArticleTest(unittest.TestCase):
+    def test_single_references_section(self):
+        article = stitch_article(
+            "AI in Healthcare",
+            "## Introduction\n\nHospitals are adopting AI.",
+            [
+                ("Costs", "Prices fell [Source: https://a.com/gpu].\n\n### References\n\n1. https://a.com/gpu"),
+                ("Adoption", "### Adoption\n\nAdoption rose [Source: https://b.com/adoption]."),
+            ],
+            "In short, [costs fell](https://a.com/gpu).",
+        )
+        self.assertEqual(article, """# AI in Healthcare
+
+Hospitals are adopting AI.
+
+### Costs
+
+Prices fell [Source: https://a.com/gpu].
+
+### Adoption
+
+Adoption rose [Source: https://b.com/adoption].
+
+### Conclusion
+
+In short, [costs fell](https://a.com/gpu).
+
+### References
+
+1. https://a.com/gpu
+2. https://b.com/adoption
+""")
+
+
+if __name__ == "__main__":
+    unittest.main()
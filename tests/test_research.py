@@ -0,0 +1,63 @@
+import unittest
+
+from research import compact_research_brief
+
+
+class CompactResearchBriefTest(unittest.TestCase):
+    def test_cites_each_url_once(self):
+        first = "https://example.com/reports/2024/ai-adoption-in-hospitals"
+        second = "https://example.org/surveys/radiology-reading-times"
+        brief = f"""## News
+
+- AI adoption in hospitals rose 40% in 2024 [Source: {first}]
+- Radiology tools cut reading times, per a survey ({second}).
+- Diagnostic tools are [reviewed here]({first})
+- Most hospitals plan more AI spending next year {first}
+"""
+        compacted = compact_research_brief(brief)
+        self.assertIn("rose 40% in 2024 [1]", compacted)
+        self.assertIn("per a survey ([2]).", compacted)
+        self.assertIn("are reviewed here [1]", compacted)
+        self.assertIn("spending next year [1]", compacted)
+        self.assertTrue(compacted.endswith(f"## Sources\n\n[1] {first}\n[2] {second}\n"))
+
+    def test_moves_markers_of_repeated_findings(self):
+        brief = """## News
+
+- AI adoption in hospitals rose 40% in 2024 [Source: https://a.com/x]
+
+## Statistics
+
+- AI adoption in hospitals rose 40% in 2024 [Source: https://b.com/y]
+- Hospitals spent $2 billion on AI tools in 2024 [Source: https://b.com/y]
+"""
+        compacted = compact_research_brief(brief)
+        self.assertEqual(compacted.count("rose 40%"), 1)
+        self.assertIn("rose 40% in 2024 [1] [2]", compacted)
+        self.assertIn("## Statistics\n\n- Hospitals spent", compacted)
+
+    def test_keeps_numbers_apart(self):
+        brief = """- AI adoption in hospitals rose 40% in 2024 [Source: https://a.com/x]
+- AI adoption in hospitals rose 25% in 2023 [Source: https://b.com/y]
+"""
+        compacted = compact_research_brief(brief)
+        self.assertIn("rose 40%", compacted)
+        self.assertIn("rose 25%", compacted)
+
+    def test_unchanged_without_repeats(self):
+        brief = "## News\n\n- One finding about hospitals [Source: https://a.com/x]\n"
+        self.assertEqual(compact_research_brief(brief), brief)
+
+    def test_token_budget_keeps_headings_and_sources(self):
+        lines = [f"- Finding number {n} about hospital staffing levels [Source: https://site{n}.com/]" for n in range(30)]
+        brief = "## News\n\n" + "\n".join(lines) + "\n\n## Trends\n\n- A single trend worth keeping around\n"
+        compacted = compact_research_brief(brief, token_budget=400)
+        self.assertLess(len(compacted), len(brief))
+        self.assertIn("## News\n\n- Finding number 0 ", compacted)
+        self.assertIn("## Trends\n\n- A single trend", compacted)
+        for n in range(30):
+            self.assertIn(f"https://site{n}.com/", compacted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import research_store
+from research_store import ResearchStore, topic_terms, years_compatible
+
+YEAR = time.localtime().tm_year
+DAY = 24 * 60 * 60
+
+
+def at(year):
+    """A timestamp in the middle of year"""
+    return time.mktime((year, 7, 1, 12, 0, 0, 0, 0, -1))
+
+
+class YearsCompatibleTest(unittest.TestCase):
+    def test_explicit_years_must_agree(self):
+        self.assertFalse(years_compatible({"2021"}, {"2025"}, at(2025), at(2025)))
+        self.assertTrue(years_compatible({"2025"}, {"2025"}, at(2025), at(2026)))
+        self.assertFalse(years_compatible({"2024", "2025"}, {"2025"}, at(2025), at(2025)))
+
+    def test_topics_without_a_year(self):
+        self.assertTrue(years_compatible(set(), set(), at(2021), at(2025)))
+        # A stored topic is about the year it was researched in
+        self.assertTrue(years_compatible({"2025"}, set(), at(2025), at(2026)))
+        self.assertFalse(years_compatible({"2021"}, set(), at(2025), at(2025)))
+        # A new topic is about the year it is asked in
+        self.assertTrue(years_compatible(set(), {"2025"}, at(2025), at(2025)))
+        self.assertFalse(years_compatible(set(), {"2025"}, at(2025), at(2026)))
+
+class ResearchStoreTest(unittest.TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.store = ResearchStore(cache_dir=cache_dir.name)
+        for topic in ["AI in healthcare", f"AI in healthcare {YEAR}", "Edge computing in retail",
+                      "Remote work productivity"]:
+            self.store.add(topic, "model", f"brief on {topic}")
+
+    def find(self, topic, model="model"):
+        match = self.store.find(topic, model)
+        return match and match.topic
+
+    def test_topic_terms(self):
+        self.assertEqual(topic_terms("Latest AI trends in Healthcare Companies 2025"),
+                         {"ai": 1, "healthcare": 1, "company": 1})
+
+    def test_rephrased_topics_match(self):
+        self.assertEqual(self.find(f"latest AI healthcare trends {YEAR}"), f"AI in healthcare {YEAR}")
+        self.assertIn(self.find("healthcare AI"), ("AI in healthcare", f"AI in healthcare {YEAR}"))
+        self.assertEqual(self.find("retail edge computing"), "Edge computing in retail")
+
+    def test_years(self):
+        self.assertIsNone(self.find("AI in healthcare 2021"))
+        # Research on a topic without a year counts as research on this year
+        self.assertIn(self.find(f"AI in healthcare {YEAR}"), ("AI in healthcare", f"AI in healthcare {YEAR}"))
+        self.assertEqual(self.find(f"Remote work productivity {YEAR}"), "Remote work productivity")
+        self.assertIsNone(self.find(f"Remote work productivity {YEAR - 1}"))
+
+    def test_broader_topics_do_not_match(self):
+        self.assertIsNone(self.find("healthcare"))
+        self.assertIsNone(self.find("AI"))
+
+    def test_other_models_do_not_match(self):
+        self.assertIsNone(self.find("AI in healthcare", model="other"))
+
+    def test_refresh_keeps_research_age(self):
+        match = self.store.find("Edge computing in retail", "model")
+        self.store.refresh(match.row_id, "news")
+        refreshed = self.store.find("Edge computing in retail", "model")
+        self.assertEqual((refreshed.brief, refreshed.news, refreshed.created),
+                         ("brief on Edge computing in retail", "news", match.created))
+        self.assertLess(refreshed.age, 60)
+
+        later = time.time() + research_store.RESEARCH_MAX_AGE + DAY
+        with mock.patch.object(research_store.time, "time", lambda: later):
+            self.assertIsNone(self.store.find("Edge computing in retail", "model"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import functools
+import hashlib
+import json
+import os
+
+from cache import DiskCache
+from fetch import page_fetcher
+from metrics import record, stage
+from ratelimit import search_limiter
+
+# Most pages the source page tool reads per call (override in .env)
+FETCH_MAX_PAGES = int(os.getenv("FETCH_MAX_PAGES", 5))
+
+# Search cache settings (override in .env)
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 6 * 60 * 60))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 5000))
+
+search_cache = DiskCache("search", ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
+
+def normalize_query(query):
+    """Normalize a search query so trivially different phrasings share a cache entry"""
+    return " ".join(query.lower().split())
+
+
+@functools.cache
+def cached_serper_tool_class():
+    """Return the CachedSerperDevTool class
+
+    Defined on first use because importing crewai_tools takes several seconds,
+    which would otherwise delay the first render of every new Streamlit server.
+    """
+    from crewai_tools import SerperDevTool
+
+    class CachedSerperDevTool(SerperDevTool):
+        """SerperDevTool that serves repeated queries from the on-disk search cache"""
+
+        def _make_api_request(self, search_query, search_type):
+            params = {
+                "q": normalize_query(search_query),
+                "type": search_type,
+                "num": self.n_results,
+                "gl": self.country,
+                "location": self.location,
+                "hl": self.locale,
+            }
+            key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+            results = search_cache.get(key)
+            if results is not None:
+                record("search_cache_hits")
+                return results
+
+            record("search_cache_misses")
+            with stage("search_api"):
+                # Paced to the Serper quota, and retried on 429, 5xx and network errors
+                results = search_limiter.call(super()._make_api_request, search_query, search_type)
+            search_cache.set(key, results)
+            return results
+
+    return CachedSerperDevTool
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_tool(n_results=10):
+    """Return the process-wide search tool for n_results, built on first use"""
+    return cached_serper_tool_class()(n_results=n_results)
+
+
+@functools.cache
+def source_pages_tool_class():
+    """Return the SourcePagesTool class, defined on first use for the same reason as above"""
+    from crewai.tools import BaseTool
+    from pydantic import BaseModel, Field
+
+    class SourcePagesInput(BaseModel):
+        urls: list[str] = Field(..., description=f"Up to {FETCH_MAX_PAGES} page URLs from the search results")
+
+    class SourcePagesTool(BaseTool):
+        """Reads several search result pages in one call instead of one tool call per page"""
+
+        name: str = "Read source pages"
+        description: str = (
+            "Fetches several web pages at once and returns the main text of each. "
+            "Use it on the most relevant search result links to get facts beyond the search snippets."
+        )
+        args_schema: type[BaseModel] = SourcePagesInput
+
+        def _run(self, urls):
+            sections = []
+            for page in page_fetcher.fetch_many(urls[:FETCH_MAX_PAGES]):
+                if "error" in page:
+                    sections.append(f"## {page['url']}\nCould not be read: {page['error']}")
+                else:
+                    sections.append(f"## {page['title'] or page['url']}\nURL: {page['url']}\n\n{page['text']}")
+            return "\n\n".join(sections)
+
+    return SourcePagesTool
+
+
+@functools.cache
+def get_source_pages_tool():
+    """Return the process-wide source page tool, built on first use"""
+    return source_pages_tool_class()()